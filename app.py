@@ -1,181 +1,75 @@
 # app.py
 import io
+import multiprocessing
 import os
+import tempfile
+import threading
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
 import warnings
+import zipfile
 
-import pandas as pd
 import streamlit as st
 
+from batch import (
+    batch_summary, bol_overlap, pair_by_week, per_week_outputs, run_batch, week_from_main,
+    week_from_name, write_combined,
+)
+from cache import ParsedFrameCache, RunMemo, code_version, content_hash
+from core import (
+    CATEGORY_MAX_UNIQUE, build_dq_lookup, process_files_chunked, process_files_parallel,
+)
+from dq_index import DQIndex
+from instrument import StepRecorder, merge_timings, peak_rss_mb, timed_iter, timings_table
+from profiling import RunProfiler
+from readers import (
+    DEFAULT_CHUNKSIZE, iter_excel_chunks, main_source_columns, memory_report, parse_workbooks,
+    to_arrow_dtypes,
+)
+from writers import (
+    DEFAULT_EXCEL_ENGINE, EXCEL_ENGINES, EXCEL_MAX_ROWS, ExcelChunkWriter, to_arrow_ipc_bytes,
+    to_csv_gz_bytes, to_excel_bytes, to_parquet_bytes,
+)
+from uploads import UploadSource, buffer_report
+
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
 st.set_page_config(page_title="Pepsico Cleaner + DQ Lookup", layout="wide")
 
-# ===============================
-# Helpers & Core Transformation
-# ===============================
-
-TEMPLATE_COLUMNS = [
-    'Tenant Name', 'Shipment Mode', 'Agg Date', 'Carrier Name', 'Destination Country',
-    'Drop-off Region', 'Region Pickup', 'Pickup Country', 'Tracking Method', 'Tracking Type',
-    'Period Date', 'Destination Country.1', 'Final Status Reason', 'P44 Shipment ID',
-    'Pickup Country.1', 'Tracked', 'Active Equipment ID', 'Attr1 Name', 'Attr1 Value',
-    'Attr2 Name', 'Attr2 Value', 'Attr3 Name', 'Attr3 Value', 'Attr4 Name', 'Attr4 Value',
-    'Attr5 Name', 'Attr5 Value', 'Bill of Lading', 'Destination Name', 'Dropoff Arrival Milestone',
-    'Dropoff City State', 'Dropoff Departure Milestone', 'Ft Shipment Error',
-    'Has Equipment ID (Yes / No)', 'Historical Equipment ID', 'IS_PING_COMPLETE',
-    'P44 Carrier ID', 'Pickup Arrival Milestone', 'Pickup City State',
-    'Pickup Departure Milestone', 'Pickup State', 'PICKUP_ARRIVAL_STATUS_30_MIN',
-    'Pickup Name', 'Tenant ID', 'Tl Equipment ID Source', 'TOTAL_STOPS', 'TRACKING_METHOD_RCA'
-]
-
-COUNTRY_MAP = {
-    "AD": "Andorra", "BA": "Bosnia and Herzegovina", "BE": "Belgium",
-    "BG": "Bulgaria", "CY": "Cyprus", "DE": "Germany", "EE": "Estonia",
-    "ES": "Spain", "FR": "France", "GB": "United Kingdom of Great Britain and Northern Ireland",
-    "GR": "Greece", "HR": "Croatia", "IT": "Italy", "LT": "Lithuania",
-    "NL": "Netherlands", "PL": "Poland", "PT": "Portugal", "RO": "Romania",
-    "RS": "Serbia", "SI": "Slovenia", "US": "United States of America"
-}
-
-EXPECTED_ATTR_MAPPING = {
-    'Business Unit': 'Attr1',
-    'PO': 'Attr2',
-    'TMSTOPID': 'Attr3',
-    'Order Type': 'Attr4',
-    'GTMSLOAT': 'Attr5'
-}
-
-def dedupe_semicolon_list(value):
-    if pd.isna(value):
-        return value
-    if isinstance(value, str):
-        # normalize commas to semicolons, split, strip, unique-preserve-order
-        for sep in [',', ';']:
-            value = value.replace(sep, ';')
-        parts = [p.strip() for p in value.split(';') if p.strip()]
-        unique = list(dict.fromkeys(parts))
-        return ';'.join(unique)
-    return value
-
-def rearrange_attrs_row(row):
-    out = {
-        'Attr1 Name': '', 'Attr1 Value': '',
-        'Attr2 Name': '', 'Attr2 Value': '',
-        'Attr3 Name': '', 'Attr3 Value': '',
-        'Attr4 Name': '', 'Attr4 Value': '',
-        'Attr5 Name': '', 'Attr5 Value': ''
-    }
-    for i in range(1, 6):
-        name = row.get(f'Attr{i} Name')
-        value = row.get(f'Attr{i} Value')
-        if pd.notna(name) and name in EXPECTED_ATTR_MAPPING:
-            target = EXPECTED_ATTR_MAPPING[name]
-            out[f'{target} Name'] = name
-            out[f'{target} Value'] = value
-    return pd.Series(out)
-
-def monday_of_week(series_dt: pd.Series) -> pd.Series:
-    # Robust: Monday = date - timedelta(weekday)
-    return (series_dt - pd.to_timedelta(series_dt.dt.weekday, unit='D')).dt.normalize()
-
-def _norm_bol(s):
-    if pd.isna(s):
-        return None
-    return str(s).strip().upper()
-
-def _find_col_ci(df, target_name):
-    """Case-insensitive, space-normalized column finder."""
-    canonical = " ".join(target_name.lower().split())
-    for c in df.columns:
-        if " ".join(str(c).lower().split()) == canonical:
-            return c
-    return None
-
-def process_files(main_df: pd.DataFrame, dq_df: pd.DataFrame | None, keep_audit_col: bool = False):
-    # 1) Start from template columns structure
-    out = pd.DataFrame(columns=TEMPLATE_COLUMNS)
-    for col in TEMPLATE_COLUMNS:
-        if col in main_df.columns:
-            out[col] = main_df[col]
-        else:
-            out[col] = None
-
-    # 2) Manual renames (copy from Shipment Tracking Type/Method if present)
-    if 'Shipment Tracking Type' in main_df.columns:
-        out['Tracking Type'] = main_df['Shipment Tracking Type']
-    if 'Shipment Tracking Method' in main_df.columns:
-        out['Tracking Method'] = main_df['Shipment Tracking Method']
-
-    # 3) Agg Date from Period Date (week starting Monday)
-    agg_nats = 0
-    if 'Period Date' in out.columns:
-        pdts = pd.to_datetime(out['Period Date'], errors='coerce')
-        out['Agg Date'] = monday_of_week(pdts)
-        agg_nats = int(pdts.isna().sum())
-
-    # 4) Country code mapping
-    for col in ['Destination Country', 'Pickup Country']:
-        if col in out.columns:
-            out[col] = out[col].map(COUNTRY_MAP).fillna(out[col])
-
-    # 5) Attribute realignment
-    attrs = out.apply(rearrange_attrs_row, axis=1)
-    for col in attrs.columns:
-        out[col] = attrs[col]
-
-    # 6) De-duplicate AttrX Value lists
-    for i in range(1, 6):
-        c = f'Attr{i} Value'
-        if c in out.columns:
-            out[c] = out[c].apply(dedupe_semicolon_list)
-
-    # 7) VLOOKUP-style update from DQ (if provided)
-    updated_count = 0
-    if dq_df is not None:
-        bol_col = _find_col_ci(dq_df, "Bill of Lading")
-        err_col = _find_col_ci(dq_df, "Tracking Error")
-        if bol_col is None or err_col is None:
-            raise KeyError(f"Required columns not found in DQ file. Have: {list(dq_df.columns)}")
-
-        dq_df['__BOL_KEY__'] = dq_df[bol_col].map(_norm_bol)
-        dq_df['__TRACKING_ERROR__'] = dq_df[err_col]
-        dq_lookup = (
-            dq_df.dropna(subset=['__BOL_KEY__'])
-                 .drop_duplicates(subset=['__BOL_KEY__'])
-                 .set_index('__BOL_KEY__')['__TRACKING_ERROR__']
-        )
-
-        if 'Bill of Lading' not in out.columns:
-            raise KeyError("'Bill of Lading' column missing in main dataset.")
-        if 'Ft Shipment Error' not in out.columns:
-            raise KeyError("'Ft Shipment Error' column missing in main dataset.")
-
-        out['__BOL_KEY__'] = out['Bill of Lading'].map(_norm_bol)
-
-        mask_not_identified = (
-            out['Ft Shipment Error'].astype(str).str.strip().str.casefold().eq('not identified')
-        )
-        mapped_errors = out.loc[mask_not_identified, '__BOL_KEY__'].map(dq_lookup)
-        idx_to_write = mapped_errors.index[
-            mapped_errors.notna() & mapped_errors.astype(str).str.len().gt(0)
-        ]
-        out.loc[idx_to_write, 'Ft Shipment Error'] = mapped_errors.loc[idx_to_write]
-        updated_count = len(idx_to_write)
-
-        if keep_audit_col:
-            out['Tracking Error (from DQ)'] = out['__BOL_KEY__'].map(dq_lookup)
-
-        out.drop(columns=['__BOL_KEY__'], inplace=True, errors='ignore')
-
-    return out, {'agg_date_nats': agg_nats, 'ft_error_updates': updated_count}
-
-def to_excel_bytes(df: pd.DataFrame, filename: str = "Pepsico0.xlsx") -> bytes:
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl", datetime_format="yyyy-mm-dd") as writer:
-        df.to_excel(writer, index=False)
-    buf.seek(0)
-    return buf.read()
+@st.cache_resource
+def parsed_upload_cache() -> ParsedFrameCache:
+    # One LRU per server process, shared by reruns and sessions
+    return ParsedFrameCache()
+
+@st.cache_resource
+def dq_history_index() -> DQIndex:
+    return DQIndex()
+
+@st.cache_resource
+def parse_pool() -> ProcessPoolExecutor:
+    # One worker per workbook; spawned so Streamlit's threads are not forked
+    return ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+
+@st.cache_resource
+def transform_pools() -> dict:
+    # Holds the server's one transform pool, keyed by its worker count
+    return {'lock': threading.Lock(), 'pools': {}}
+
+def transform_pool(workers: int) -> ProcessPoolExecutor:
+    """The shared transform pool, replaced (and the old one shut down) when ``workers`` changes."""
+    holder = transform_pools()
+    with holder['lock']:
+        pools = holder['pools']
+        if workers not in pools:
+            # Runs already submitted to the old pool still finish
+            for pool in pools.values():
+                pool.shutdown(wait=False)
+            pools.clear()
+            pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return pools[workers]
 
 # ===============================
 # UI
@@ -193,60 +87,420 @@ with st.sidebar:
     st.header("Options")
     keep_audit = st.checkbox("Keep audit column ‘Tracking Error (from DQ)’", value=False)
     show_preview = st.checkbox("Show result preview (first 200 rows)", value=True)
+    streaming_reader = st.checkbox(
+        "Low-memory (streaming) reader", value=True,
+        help="Stream workbooks row by row. Either way only the columns the report "
+             "uses are parsed."
+    )
+    dtype_backend = st.selectbox(
+        "Column dtypes", ["object", "arrow"], index=0,
+        help="'arrow' keeps text as string[pyarrow] and low-cardinality columns as categoricals."
+    )
+    category_max_unique = st.number_input(
+        "Categorical threshold (distinct values, 0 = off)", min_value=0,
+        value=CATEGORY_MAX_UNIQUE, step=100,
+        help="Template columns with at most this many distinct values are stored as categoricals."
+    )
+    show_memory = st.checkbox("Show memory report (object vs Arrow)", value=False)
+    trace_allocations = st.checkbox(
+        "Trace Python allocations (slower)", value=False,
+        help="Adds each step's peak tracemalloc allocation to the step timings."
+    )
+    excel_engine = st.selectbox(
+        "XLSX writer", list(EXCEL_ENGINES), index=list(EXCEL_ENGINES).index(DEFAULT_EXCEL_ENGINE),
+        help="'openpyxl-write-only' and 'xlsxwriter' stream rows with constant memory."
+    )
+    use_dq_history = st.checkbox(
+        "Use DQ history from earlier uploads", value=False,
+        help="Merge each DQ upload into a persistent BOL index and fall back to it "
+             "for BOLs the current DQ file does not cover."
+    )
+    parallel_parse = st.checkbox(
+        "Parse main and DQ files in parallel", value=True,
+        help="Read both workbooks at the same time in separate worker processes."
+    )
+    workers = st.number_input(
+        "Worker processes", min_value=1, max_value=32, value=1,
+        help="Split the main file into row ranges and transform them on this many cores; "
+             "in batch mode, the number of weeks processed at once."
+    )
+    chunked = st.checkbox(
+        "Chunked processing (bounded memory)", value=False,
+        help="Process and write the main file in row batches; for multi-million-row reports."
+    )
+    chunk_rows = st.number_input("Rows per chunk", min_value=1_000, value=DEFAULT_CHUNKSIZE,
+                                 step=10_000, disabled=not chunked)
+    profile_run = st.checkbox(
+        "Profile this run", value=False,
+        help="Run read → process → XLSX export in-process under cProfile, bypassing caches "
+             "and worker pools, and offer the profile as a download."
+    )
+    sample_stacks = st.checkbox("Profile: also sample stacks (flamegraph)", value=True,
+                                disabled=not profile_run)
+    batch_mode = st.checkbox(
+        "Batch mode (many weeks)", value=False,
+        help="Upload several main and DQ files; pairs are matched by the week in their "
+             "file names (or the main file's Period Date; DQ files without a date are "
+             "matched by shared BOLs) and processed concurrently on the worker processes."
+    )
+    batch_combined = st.checkbox("Batch: one combined file", value=True, disabled=not batch_mode)
 
 col1, col2 = st.columns(2)
 with col1:
-    main_file = st.file_uploader("Main file: Data Availability Trend by Selected Dimensions",
-                                 type=["xlsx"])
+    main_upload = st.file_uploader("Main file: Data Availability Trend by Selected Dimensions",
+                                   type=["xlsx"], accept_multiple_files=batch_mode)
 with col2:
-    dq_file = st.file_uploader("Vlookup file: Data Quality by Carrier", type=["xlsx"])
+    dq_upload = st.file_uploader("Vlookup file: Data Quality by Carrier", type=["xlsx"],
+                                 accept_multiple_files=batch_mode)
+main_file = None if batch_mode else main_upload
+dq_file = None if batch_mode else dq_upload
 
 process = st.button("Process")
 
-if process:
+def upload_digest(upload) -> str:
+    # Hash each uploaded file once per session rather than on every rerun
+    digests = st.session_state.setdefault('upload_digests', {})
+    if upload.file_id not in digests:
+        digests[upload.file_id] = content_hash(upload)
+    return digests[upload.file_id]
+
+def render_downloads(xls_data, run=None):
+    d1, d2, d3, d4 = st.columns(4)
+    d1.download_button(
+        label="⬇️ Download Pepsico0.xlsx",
+        data=xls_data,
+        file_name="Pepsico0.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        on_click="ignore"
+    )
+    if run is None:
+        return
+    d2.download_button(
+        label="⬇️ Parquet",
+        data=lambda: memo.export(run, 'parquet', to_parquet_bytes),
+        file_name="Pepsico0.parquet",
+        mime="application/vnd.apache.parquet",
+        on_click="ignore"
+    )
+    d3.download_button(
+        label="⬇️ CSV (gzip)",
+        data=lambda: memo.export(run, 'csv.gz', to_csv_gz_bytes),
+        file_name="Pepsico0.csv.gz",
+        mime="application/gzip",
+        on_click="ignore"
+    )
+    d4.download_button(
+        label="⬇️ Arrow IPC",
+        data=lambda: memo.export(run, 'arrow', to_arrow_ipc_bytes),
+        file_name="Pepsico0.arrow",
+        mime="application/vnd.apache.arrow.file",
+        on_click="ignore"
+    )
+
+def render_profile(profile):
+    p1, p2, _, _ = st.columns(4)
+    p1.download_button(
+        label="⬇️ Profile (pstats)",
+        data=profile['pstats'],
+        file_name="Pepsico0.pstats",
+        mime="application/octet-stream",
+        on_click="ignore"
+    )
+    if profile['collapsed'] is not None:
+        p2.download_button(
+            label="⬇️ Stacks (collapsed)",
+            data=profile['collapsed'],
+            file_name="Pepsico0.collapsed.txt",
+            mime="text/plain",
+            on_click="ignore"
+        )
+    with st.expander("Profile: top functions by cumulative time"):
+        st.code(profile['summary'])
+
+def render_results(n_rows, stats, preview_df, xls_data, run=None, parse_timings=None,
+                   export_timings=()):
+    st.success("Processing complete.")
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Rows processed", n_rows)
+    m2.metric("NaT in Period Date", stats.get('agg_date_nats', 0))
+    m3.metric("Ft Shipment Error updated", stats.get('ft_error_updates', 0))
+    peak_rss = peak_rss_mb()
+    m4.metric("Server peak RSS (MiB)", f"{peak_rss:,.0f}" if peak_rss is not None else "n/a",
+              help="Highest resident memory of the server process since it started, across "
+                   "all runs; the step timings show how much each step of this run added.")
+    parse_timings = parse_timings or {}
+    # Files served from the parsed-frame cache have no timing
+    t1, t2, _, _ = st.columns(4)
+    for col, label, name in ((t1, 'main', "Main parse (s)"), (t2, 'dq', "DQ parse (s)")):
+        if label in parse_timings:
+            col.metric(name, f"{parse_timings[label]['wall_s']:.2f}")
+    timings = [*parse_timings.values(), *stats.get('timings', ()), *export_timings]
+    if timings:
+        with st.expander("Step timings"):
+            st.dataframe(timings_table(timings))
+            st.caption("XLSX export timings appear after the first download.")
+
+    if show_preview and preview_df is not None:
+        st.dataframe(preview_df)
+
+    render_downloads(xls_data, run)
+
+# Results of earlier runs in this session, keyed by input fingerprint
+memo = st.session_state.setdefault('run_memo', RunMemo())
+
+def make_run_key() -> tuple:
+    # Runs that read the DQ history are only reusable while the index is unchanged
+    return (upload_digest(main_file), upload_digest(dq_file) if dq_file else None,
+            keep_audit, use_dq_history, dtype_backend, int(category_max_unique),
+            code_version(), dq_history_index().version() if use_dq_history else None)
+
+run_key = make_run_key() if main_file else None
+run = memo.get(run_key) if run_key and not chunked and not profile_run else None
+
+def xlsx_export(run) -> bytes:
+    """XLSX bytes of a memoized run, built (and timed) on first use."""
+    def build(df):
+        recorder = StepRecorder()
+        with recorder.step(f'write xlsx ({excel_engine})', len(df)):
+            data = to_excel_bytes(df, filename="Pepsico0.xlsx", engine=excel_engine)
+        run['export_timings'].extend(recorder.records)
+        return data
+    return memo.export(run, ('xlsx', excel_engine), build)
+
+def run_batch_mode(main_uploads, dq_uploads):
+    if not main_uploads:
+        st.error("Please upload at least one main file.")
+        return
+    # Keyed by file_id: uploads may share a file name
+    names = {u.file_id: u.name for u in (*main_uploads, *dq_uploads)}
+    with ExitStack() as stack:
+        sources = {u.file_id: stack.enter_context(UploadSource(u))
+                   for u in (*main_uploads, *dq_uploads)}
+        mains = {}
+        for u in main_uploads:
+            week = week_from_name(u.name)
+            if week is None:
+                week = week_from_main(sources[u.file_id].open())
+            mains[u.file_id] = week
+        dqs = {u.file_id: week_from_name(u.name) for u in dq_uploads}
+        # DQ files without a week in their name are matched by shared BOLs
+        pairs, unmatched = pair_by_week(
+            mains, dqs, overlap=bol_overlap(lambda key: sources[key].open()))
+        for key, reason in unmatched:
+            st.warning(f"Skipped DQ file {names[key]}: {reason}.")
+        batch_executor = transform_pool(int(workers)) if workers > 1 else None
+        if batch_executor is not None:
+            # Workers open the temp file instead of receiving a pickled copy of each upload
+            for src in sources.values():
+                src.spill()
+        results, totals = run_batch(
+            pairs, {key: src.payload() for key, src in sources.items()}, names=names,
+            executor=batch_executor,
+            streaming=streaming_reader, dtype_backend=dtype_backend, keep_audit_col=keep_audit,
+            category_max_unique=int(category_max_unique)
+        )
+
+    for r in results:
+        for note in r['notes']:
+            st.warning(f"{r['main']}: {note}")
+        if r['error']:
+            st.error(f"{r['main']}: {r['error']}")
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Weeks processed", totals['weeks'] - totals['failed'])
+    m2.metric("Rows processed", f"{totals['rows']:,}")
+    m3.metric("Rows / second", f"{totals['rows_per_second']:,.0f}")
+    m4.metric("Input MiB / second", f"{totals['input_mib_per_second']:.2f}")
+    st.dataframe(batch_summary(results))
+
+    if batch_combined:
+        xls_file = tempfile.TemporaryFile()
+        try:
+            rows = write_combined(results, xls_file)
+        except Exception as e:
+            st.error(f"Could not write the combined file: {e}")
+            return
+        if rows >= EXCEL_MAX_ROWS:
+            st.info("More rows than one Excel sheet holds: the combined file continues "
+                    "on further sheets.")
+        def xls_data():
+            xls_file.seek(0)
+            return xls_file.read()
+        st.download_button(
+            label="⬇️ Download Pepsico0_all_weeks.xlsx",
+            data=xls_data,
+            file_name="Pepsico0_all_weeks.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click="ignore"
+        )
+    else:
+        def zip_data():
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, 'w') as zf:
+                for name, data in per_week_outputs(results):
+                    zf.writestr(name, data)
+            return buf.getvalue()
+        st.download_button(
+            label="⬇️ Download Pepsico0_weekly.zip",
+            data=zip_data,
+            file_name="Pepsico0_weekly.zip",
+            mime="application/zip",
+            on_click="ignore"
+        )
+
+if process and batch_mode:
+    run_batch_mode(main_upload or [], dq_upload or [])
+
+if process and run is None and not batch_mode:
     if not main_file:
         st.error("Please upload the main file.")
         st.stop()
 
-    try:
-        main_df = pd.read_excel(main_file, dtype=str)
-        # Keep original dtypes where relevant
-    except Exception as e:
-        st.error(f"Failed to read main file: {e}")
-        st.stop()
+    # Parsers read straight from the upload buffers (large ones via a memory-mapped temp file)
+    with ExitStack() as sources_stack:
+        sources = {'main': sources_stack.enter_context(UploadSource(main_file))}
+        if dq_file is not None:
+            sources['dq'] = sources_stack.enter_context(UploadSource(dq_file))
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            sources_stack.callback(tracemalloc.stop)
+        profiler = None
+        if profile_run:
+            # Everything below runs in this thread so cProfile sees it
+            profiler = RunProfiler(sample_stacks=sample_stacks)
+            profiler.start()
+            sources_stack.callback(profiler.stop)
+
+        # Parse whichever workbooks are not cached yet, side by side in worker processes
+        cache = parsed_upload_cache()
+        cache_keys = {'main': (run_key[0], 'main', streaming_reader, dtype_backend)}
+        if dq_file is not None:
+            cache_keys['dq'] = (run_key[1], 'dq', streaming_reader, dtype_backend)
+        if chunked:
+            # Main rows are streamed batch by batch during processing instead
+            del cache_keys['main']
+        frames = {label: None if profile_run else cache.get(key)
+                  for label, key in cache_keys.items()}
+        pending = [label for label, df in frames.items() if df is None]
+        parallel = parallel_parse and not profile_run and len(pending) > 1
+        parse_executor = parse_pool() if parallel else None
+        if parse_executor is not None:
+            # Workers open the temp file instead of receiving a pickled copy of each upload
+            for label in pending:
+                sources[label].spill()
+        jobs = {label: (label, sources[label].payload()) for label in pending}
+        parsed, parse_timings, parse_errors = parse_workbooks(
+            jobs, streaming=streaming_reader, dtype_backend=dtype_backend, executor=parse_executor
+        )
+        for label, df in parsed.items():
+            cache.put(cache_keys[label], df)
+            frames[label] = df
 
-    dq_df = None
-    if dq_file is not None:
         try:
-            dq_df = pd.read_excel(dq_file, dtype=str)
+            if 'main' in parse_errors:
+                raise parse_errors['main']
+            if chunked:
+                # Read lazily; rows are pulled batch by batch during processing
+                main_chunks = iter_excel_chunks(sources['main'].open(),
+                                                columns=main_source_columns(sources['main'].open()),
+                                                chunksize=int(chunk_rows))
+                if dtype_backend == 'arrow':
+                    main_chunks = map(to_arrow_dtypes, main_chunks)
+            else:
+                main_df = frames['main']
         except Exception as e:
-            st.warning(f"Could not read DQ file—continuing without VLOOKUP. Error: {e}")
-            dq_df = None
-
-    try:
-        result_df, stats = process_files(main_df, dq_df, keep_audit_col=keep_audit)
+            st.error(f"Failed to read main file: {e}")
+            st.stop()
 
-        st.success("Processing complete.")
-        m1, m2, m3 = st.columns(3)
-        m1.metric("Rows processed", len(result_df))
-        m2.metric("NaT in Period Date", stats.get('agg_date_nats', 0))
-        m3.metric("Ft Shipment Error updated", stats.get('ft_error_updates', 0))
+        dq_df = frames.get('dq')
+        notes = []
+        if 'dq' in parse_errors:
+            notes.append(f"Could not read DQ file—continuing without VLOOKUP. Error: {parse_errors['dq']}")
 
-        if show_preview:
-            st.dataframe(result_df.head(200))
-
-        xls_bytes = to_excel_bytes(result_df, filename="Pepsico0.xlsx")
-        st.download_button(
-            label="⬇️ Download Pepsico0.xlsx",
-            data=xls_bytes,
-            file_name="Pepsico0.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-
-    except KeyError as ke:
-        st.error(f"Missing required column: {ke}")
-    except Exception as e:
-        st.error(f"Unexpected error: {e}")
+        try:
+            dq_lookup = build_dq_lookup(dq_df) if dq_df is not None else None
+            dq_index = dq_history_index() if use_dq_history else None
+            if dq_index is not None and dq_lookup is not None:
+                # The report week decides which upload's error wins for a BOL
+                week = week_from_name(dq_file.name)
+                if week is None:
+                    week = week_from_name(main_file.name)
+                if week is None:
+                    week = week_from_main(sources['main'].open())
+                dq_index.update(dq_lookup, source=f"{dq_file.name} {run_key[1]}", week=week)
+
+            if chunked:
+                for note in notes:
+                    st.warning(note)
+                preview_df, stats = None, {}
+                recorder = StepRecorder()
+                xls_file = tempfile.TemporaryFile()
+                with ExcelChunkWriter(xls_file) as writer:
+                    chunk_results = process_files_chunked(
+                        timed_iter(main_chunks, recorder, 'read main (chunks)'), None,
+                        keep_audit_col=keep_audit, dq_lookup=dq_lookup, dq_index=dq_index,
+                        category_max_unique=int(category_max_unique)
+                    )
+                    for chunk_df, stats in chunk_results:
+                        with recorder.step('write xlsx (chunks)', len(chunk_df)):
+                            writer.write(chunk_df)
+                        if preview_df is None:
+                            preview_df = chunk_df.head(200)
+                export_timings = merge_timings(recorder.records)
+                def xls_data():
+                    xls_file.seek(0)
+                    return xls_file.read()
+                profile = profiler.outputs() if profiler is not None else None
+                render_results(stats.get('rows', 0), stats, preview_df, xls_data,
+                               parse_timings=parse_timings, export_timings=export_timings)
+                if writer.sheets > 1:
+                    st.info(f"More rows than one Excel sheet holds: Pepsico0.xlsx continues "
+                            f"across {writer.sheets} sheets.")
+                if profile is not None:
+                    render_profile(profile)
+                if show_memory:
+                    with st.expander("Memory: bytes held per stage (MiB)"):
+                        st.dataframe(buffer_report(sources))
+            else:
+                result_df, stats = process_files_parallel(
+                    main_df, None, keep_audit_col=keep_audit, dq_lookup=dq_lookup,
+                    dq_index=dq_index, category_max_unique=int(category_max_unique),
+                    workers=1 if profile_run else int(workers),
+                    executor=transform_pool(int(workers)) if workers > 1 and not profile_run else None
+                )
+                # Re-keyed: merging this run's DQ upload may have changed the index version
+                run = memo.put(
+                    make_run_key(), result_df, stats, notes, parse_timings=parse_timings,
+                    export_timings=[],
+                    memory_report=memory_report(main_df) if show_memory else None,
+                    buffer_report=buffer_report(sources, {'main': main_df, 'dq': dq_df})
+                    if show_memory else None,
+                )
+                if profiler is not None:
+                    xlsx_export(run)
+                    run['profile'] = profiler.outputs()
+
+        except KeyError as ke:
+            st.error(f"Missing required column: {ke}")
+        except Exception as e:
+            st.error(f"Unexpected error: {e}")
+
+if run is not None:
+    for note in run['notes']:
+        st.warning(note)
+    result_df = run['result_df']
+    if show_memory and run.get('memory_report') is not None:
+        with st.expander("Memory: main file as object vs Arrow dtypes"):
+            st.dataframe(run['memory_report'])
+    if show_memory and run.get('buffer_report') is not None:
+        with st.expander("Memory: bytes held per stage (MiB)"):
+            st.dataframe(run['buffer_report'])
+    # Export payloads are built on first click and reused afterwards
+    render_results(
+        len(result_df), run['stats'], result_df.head(200), lambda: xlsx_export(run),
+        run, parse_timings=run['parse_timings'], export_timings=run['export_timings']
+    )
+    if run.get('profile') is not None:
+        render_profile(run['profile'])
 
 st.markdown("---")
-st.caption("Tip: If your column headers differ slightly (spaces/casing), the DQ step is flexible; core template columns must match exactly.")
+st.caption("Tip: Column headers in both files are matched ignoring casing and extra spaces.")
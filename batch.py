@@ -0,0 +1,251 @@
+# batch.py
+"""Batch mode: process many weekly main/DQ report pairs in one run."""
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from core import (
+    CATEGORY_MAX_UNIQUE, HeaderIndex, _norm_bol_series, monday_of_week, process_files,
+)
+from readers import iter_excel_chunks, read_dq, read_header, read_main
+from uploads import open_payload
+from writers import ExcelChunkWriter, to_csv_gz_bytes, to_excel_bytes, to_parquet_bytes
+
+# 2024-05-13, 2024_05_13, 20240513 and ISO weeks such as 2024-W20
+_DATE_IN_NAME = re.compile(r'(?<!\d)(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)')
+_ISO_WEEK_IN_NAME = re.compile(r'(?<!\d)(\d{4})[-_ ]?W(\d{1,2})(?!\d)', re.IGNORECASE)
+
+BATCH_FORMATS = {
+    'xlsx': to_excel_bytes,
+    'parquet': to_parquet_bytes,
+    'csv.gz': to_csv_gz_bytes,
+}
+
+def week_from_name(name) -> pd.Timestamp | None:
+    """Monday of the week a file name refers to (ISO date or ISO week), if any."""
+    stem = Path(str(name)).stem
+    m = _ISO_WEEK_IN_NAME.search(stem)
+    if m:
+        try:
+            return pd.Timestamp(date.fromisocalendar(int(m[1]), int(m[2]), 1))
+        except ValueError:
+            pass
+    for m in _DATE_IN_NAME.finditer(stem):
+        try:
+            day = pd.Timestamp(int(m[1]), int(m[2]), int(m[3]))
+        except ValueError:
+            continue
+        return day - pd.Timedelta(days=day.weekday())
+    return None
+
+def week_from_main(source) -> pd.Timestamp | None:
+    """Most common Agg Date of a main workbook, streaming only its Period Date column."""
+    column = HeaderIndex(read_header(source)).resolve('Period Date')
+    if column is None:
+        return None
+    weeks = Counter()
+    for chunk in iter_excel_chunks(source, columns=[column]):
+        dates = pd.to_datetime(chunk[column], errors='coerce').dropna()
+        weeks.update(monday_of_week(dates))
+    return weeks.most_common(1)[0][0] if weeks else None
+
+def bol_keys(source) -> set:
+    """Normalized Bill of Lading keys of a workbook, streaming only that column."""
+    column = HeaderIndex(read_header(source)).resolve('Bill of Lading', prefer_exact=False)
+    if column is None:
+        return set()
+    keys = set()
+    for chunk in iter_excel_chunks(source, columns=[column]):
+        keys.update(_norm_bol_series(chunk[column]).dropna())
+    return keys
+
+def bol_overlap(open_source):
+    """``overlap`` for pair_by_week: the number of BOLs a main and a DQ file share.
+
+    ``open_source(key)`` returns a path or binary file object for a file key.
+    Each file's BOLs are read once, and only if pair_by_week asks for them.
+    """
+    keys = {}
+    def overlap(main, dq) -> int:
+        for key in (main, dq):
+            if key not in keys:
+                keys[key] = bol_keys(open_source(key))
+        return len(keys[main] & keys[dq])
+    return overlap
+
+def pair_by_week(mains: dict, dqs: dict, overlap=None):
+    """Match main and DQ files that cover the same week.
+
+    ``mains`` and ``dqs`` map file keys to their week (None when unknown). A
+    single main and a single DQ file are always paired. A DQ file without a
+    week goes to the main file without a DQ file that scores highest on
+    ``overlap(main, dq)`` (e.g. bol_overlap), if any scores above zero.
+    Returns ``(pairs, unmatched)``: ``(week, main, dq or None)`` tuples in
+    week order, and ``(dq, reason)`` for each DQ file left over.
+    """
+    if len(mains) == 1 and len(dqs) == 1:
+        (main, week), (dq, _) = next(iter(mains.items())), next(iter(dqs.items()))
+        return [(week, main, dq)], []
+
+    dq_for_week, undated, unmatched = {}, [], []
+    for name in sorted(dqs):
+        week = dqs[name]
+        if week is None:
+            undated.append(name)
+        elif week in dq_for_week:
+            unmatched.append((name, "another DQ file covers the same week"))
+        else:
+            dq_for_week[week] = name
+    dq_for_main = {main: dq_for_week.get(week) for main, week in mains.items()
+                   if week is not None}
+    used = set(dq_for_main.values())
+    unmatched += [(name, "no main file for its week")
+                  for name in dq_for_week.values() if name not in used]
+
+    for name in undated:
+        free = [main for main in mains if dq_for_main.get(main) is None]
+        if overlap is None:
+            unmatched.append((name, "no week in its file name"))
+            continue
+        scores = {main: overlap(main, name) for main in free}
+        best = max(free, key=scores.get, default=None)
+        if best is None or scores[best] <= 0:
+            unmatched.append((name, "no week in its file name and no main file "
+                                    "without a DQ file shares its BOLs"))
+        else:
+            dq_for_main[best] = name
+
+    pairs = [(week, main, dq_for_main.get(main)) for main, week in mains.items()]
+    pairs.sort(key=lambda p: (p[0] is None, p[0] or pd.Timestamp.min, p[1]))
+    return pairs, sorted(unmatched)
+
+def run_week(week, main_name: str, main_payload, dq_name: str | None, dq_payload,
+             streaming: bool = True, dtype_backend: str = 'object', keep_audit_col: bool = False,
+             category_max_unique: int | None = CATEGORY_MAX_UNIQUE) -> dict:
+    """Parse and process one main/DQ pair (picklable, for a process pool).
+
+    Never raises: a failure is reported under ``'error'``.
+    """
+    start = time.perf_counter()
+    result = {'week': week, 'main': main_name, 'dq': dq_name, 'notes': [], 'error': None,
+              'result_df': None, 'stats': {}}
+    try:
+        with open_payload(main_payload) as source:
+            main_df = read_main(source, streaming=streaming, dtype_backend=dtype_backend)
+        dq_df = None
+        if dq_payload is not None:
+            try:
+                with open_payload(dq_payload) as source:
+                    dq_df = read_dq(source, streaming=streaming, dtype_backend=dtype_backend)
+            except Exception as e:
+                result['notes'].append(
+                    f"Could not read DQ file—continuing without VLOOKUP. Error: {e}")
+        result['result_df'], result['stats'] = process_files(
+            main_df, dq_df, keep_audit_col=keep_audit_col, category_max_unique=category_max_unique)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def run_batch(pairs, payloads: dict, executor: ProcessPoolExecutor | None = None,
+              names: dict | None = None, **options):
+    """Run every ``(week, main, dq)`` pair, concurrently when ``executor`` is given.
+
+    ``payloads`` maps the file keys used in ``pairs`` to UploadSource.payload()
+    values or paths; ``names`` maps keys to the file names shown in results
+    (default: the keys themselves). ``options`` are passed to run_week.
+    Returns ``(results, totals)`` with results in the order of ``pairs``.
+    """
+    start = time.perf_counter()
+    names = names or {}
+    args = [(week, names.get(main, main), payloads[main],
+             names.get(dq, dq) if dq else None, payloads[dq] if dq else None)
+            for week, main, dq in pairs]
+    if executor is None:
+        results = [run_week(*a, **options) for a in args]
+    else:
+        futures = [executor.submit(run_week, *a, **options) for a in args]
+        results = [future.result() for future in futures]
+    seconds = time.perf_counter() - start
+
+    rows = sum(len(r['result_df']) for r in results if r['result_df'] is not None)
+    input_bytes = sum(_payload_nbytes(payloads[name]) for name in
+                      {n for _, main, dq in pairs for n in (main, dq) if n})
+    totals = {
+        'weeks': len(results),
+        'failed': sum(r['error'] is not None for r in results),
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+        'input_mib_per_second': input_bytes / 2**20 / seconds if seconds else 0.0,
+    }
+    return results, totals
+
+def _payload_nbytes(payload) -> int:
+    if isinstance(payload, (str, Path)):
+        return Path(payload).stat().st_size
+    return memoryview(payload).nbytes
+
+def batch_summary(results) -> pd.DataFrame:
+    """One row per processed pair, for display."""
+    return pd.DataFrame([{
+        'Week': r['week'].date() if r['week'] is not None else None,
+        'Main file': r['main'],
+        'DQ file': r['dq'],
+        'Rows': len(r['result_df']) if r['result_df'] is not None else 0,
+        'NaT in Period Date': r['stats'].get('agg_date_nats', 0),
+        'Ft Shipment Error updated': r['stats'].get('ft_error_updates', 0),
+        'Seconds': round(r['seconds'], 2),
+        'Error': r['error'],
+    } for r in results])
+
+def week_label(result) -> str:
+    if result['week'] is not None:
+        return f"{result['week']:%Y-%m-%d}"
+    return Path(result['main']).stem
+
+def per_week_outputs(results, fmt: str = 'xlsx'):
+    """Yield ``(file name, bytes)`` for each successful pair.
+
+    Names are unique: a second file for the same week gets a ``_2`` suffix,
+    and so on.
+    """
+    used = set()
+    for r in results:
+        if r['result_df'] is not None:
+            label = name = week_label(r)
+            n = 1
+            while name in used:
+                n += 1
+                name = f"{label}_{n}"
+            used.add(name)
+            yield f"Pepsico0_{name}.{fmt}", BATCH_FORMATS[fmt](r['result_df'])
+
+def write_combined(results, target, fmt: str = 'xlsx') -> int:
+    """Write all successful pairs, in order, as one file; returns the row count.
+
+    Every week gets the union of all weeks' columns (a week without a DQ file
+    has no audit column). XLSX is streamed week by week, continuing on a new
+    sheet at Excel's row limit; other formats are concatenated first.
+    """
+    frames = [r['result_df'] for r in results if r['result_df'] is not None]
+    columns = list(dict.fromkeys(col for df in frames for col in df.columns))
+    frames = [df if list(df.columns) == columns else df.reindex(columns=columns)
+              for df in frames]
+    if fmt == 'xlsx':
+        with ExcelChunkWriter(target) as writer:
+            for df in frames:
+                writer.write(df)
+    else:
+        combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        data = BATCH_FORMATS[fmt](combined)
+        if hasattr(target, 'write'):
+            target.write(data)
+        else:
+            Path(target).write_bytes(data)
+    return sum(len(df) for df in frames)
@@ -0,0 +1,55 @@
+"""Benchmark: row-wise reference.rearrange_attrs_row vs column-wise attribute realignment.
+
+    python -m benchmarks.bench_attrs --sizes 10000 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import ATTR_COLUMNS, ATTR_SLOTS, EXPECTED_ATTR_MAPPING, _rearrange_attrs
+from reference import rearrange_attrs_row
+
+NAME_POOL = list(EXPECTED_ATTR_MAPPING) + ['Customer Ref', None]
+
+def make_attrs_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for slot in ATTR_SLOTS:
+        data[f'{slot} Name'] = rng.choice(np.array(NAME_POOL, dtype=object), size=n)
+        values = rng.integers(0, 10_000, size=n).astype(str).astype(object)
+        values[rng.random(n) < 0.1] = None
+        data[f'{slot} Value'] = values
+    return pd.DataFrame(data, dtype=str)
+
+def _assign(df: pd.DataFrame, attrs: pd.DataFrame) -> pd.DataFrame:
+    # Mirror process_files step 5 so the comparison covers the final dtypes.
+    out = df.copy()
+    for col in attrs.columns:
+        out[col] = attrs[col]
+    return out[ATTR_COLUMNS]
+
+def run(sizes, reference_limit: int) -> None:
+    print(f"{'rows':>10} {'row-wise s':>12} {'vectorized s':>13} {'speedup':>8}")
+    for n in sizes:
+        df = make_attrs_frame(n)
+        t0 = time.perf_counter()
+        fast = pd.DataFrame(_rearrange_attrs(df), index=df.index)
+        t_fast = time.perf_counter() - t0
+        if n > reference_limit:
+            print(f"{n:>10} {'skipped':>12} {t_fast:>13.3f} {'-':>8}")
+            continue
+        t0 = time.perf_counter()
+        slow = df.apply(rearrange_attrs_row, axis=1)
+        t_slow = time.perf_counter() - t0
+        pd.testing.assert_frame_equal(_assign(df, fast), _assign(df, slow))
+        print(f"{n:>10} {t_slow:>12.3f} {t_fast:>13.3f} {t_slow / t_fast:>7.0f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--reference-limit', type=int, default=1_000_000,
+                        help="Skip the row-wise reference above this many rows.")
+    args = parser.parse_args()
+    run(args.sizes, args.reference_limit)
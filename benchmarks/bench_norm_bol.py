@@ -0,0 +1,44 @@
+"""Benchmark: Series.map(_norm_bol) vs the vectorized _norm_bol_series.
+
+    python -m benchmarks.bench_norm_bol --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import _norm_bol, _norm_bol_series
+
+def make_bol_keys(n: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    keys = np.char.add('bol', rng.integers(0, n, size=n).astype(str)).astype(object)
+    pad = rng.random(n)
+    keys[pad < 0.2] = np.char.add(' ', keys[pad < 0.2].astype(str))
+    keys[pad > 0.95] = None
+    keys[:3] = ['straße 1', ' Ǆx ', 'ﬁle']  # non-ASCII case mapping
+    return pd.Series(keys, dtype=str)
+
+def run(n: int, repeat: int) -> None:
+    for label, dtype in (('str', str), ('object', object)):
+        s = make_bol_keys(n).astype(dtype)
+        t_map = min(_timed(lambda: s.map(_norm_bol)) for _ in range(repeat))
+        t_vec = min(_timed(lambda: _norm_bol_series(s)) for _ in range(repeat))
+        pd.testing.assert_series_equal(
+            s.map(_norm_bol).astype(object).where(s.notna()),
+            _norm_bol_series(s).astype(object).where(s.notna()),
+        )
+        print(f"{label:>7} dtype, {n:,} keys: map {t_map / n * 1e9:7.1f} ns/row, "
+              f"vectorized {t_vec / n * 1e9:7.1f} ns/row ({t_map / t_vec:.1f}x)")
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
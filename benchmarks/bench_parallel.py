@@ -0,0 +1,59 @@
+"""Benchmark: process_files_parallel scaling over 1/2/4/8 worker processes.
+
+Each worker count gets a warm pool (spawn cost excluded) and is checked
+against the single-process result.
+
+    python -m benchmarks.bench_parallel --rows 500000 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core import EXPECTED_ATTR_MAPPING, MAIN_SOURCE_COLUMNS, process_files, process_files_parallel
+
+def make_inputs(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    pool = np.array([f'value {i}' for i in range(200)], dtype=object)
+    df = pd.DataFrame({c: rng.choice(pool, size=n) for c in MAIN_SOURCE_COLUMNS}, dtype=str)
+    df['Period Date'] = rng.choice(np.array(['2024-05-08', '2024-05-13', 'bad'], dtype=object), n)
+    df['Destination Country'] = rng.choice(np.array(['DE', 'US', 'FR', 'Mexico'], dtype=object), n)
+    df['Ft Shipment Error'] = rng.choice(np.array(['Not Identified', 'Other'], dtype=object), n)
+    df['Bill of Lading'] = [f'BOL{i}' for i in range(n)]
+    names = np.array(list(EXPECTED_ATTR_MAPPING) + ['Other'], dtype=object)
+    for i in range(1, 6):
+        df[f'Attr{i} Name'] = rng.choice(names, size=n)
+        df[f'Attr{i} Value'] = rng.choice(np.array(['a;b;a', 'c, c', 'd'], dtype=object), n)
+    dq = pd.DataFrame({'Bill of Lading': [f'BOL{i}' for i in range(0, n, 2)],
+                       'Tracking Error': 'Late'}, dtype=str)
+    return df, dq
+
+def run(rows, workers) -> None:
+    print(f"cpu_count={os.cpu_count()}")
+    print(f"{'rows':>9} {'workers':>7} {'seconds':>8} {'speedup':>8}")
+    ctx = multiprocessing.get_context('spawn')
+    for n in rows:
+        df, dq = make_inputs(n)
+        t0 = time.perf_counter()
+        expected, _ = process_files(df, dq)
+        serial = time.perf_counter() - t0
+        print(f"{n:>9} {'serial':>7} {serial:>8.3f} {1.0:>8.2f}")
+        for w in workers:
+            with ProcessPoolExecutor(w, mp_context=ctx) as pool:
+                list(pool.map(abs, range(w)))  # start every worker before timing
+                t0 = time.perf_counter()
+                out, _ = process_files_parallel(df, dq, workers=w, executor=pool)
+                elapsed = time.perf_counter() - t0
+            pd.testing.assert_frame_equal(out.astype(object), expected.astype(object))
+            print(f"{n:>9} {w:>7} {elapsed:>8.3f} {serial / elapsed:>8.2f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[500_000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    run(args.rows, args.workers)
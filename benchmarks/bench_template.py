@@ -0,0 +1,71 @@
+"""Benchmark: building the template frame column by column vs in one construction.
+
+Also reports wall time and tracemalloc peak of the full process_files.
+
+    python -m benchmarks.bench_template --rows 100000 500000
+"""
+import argparse
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from core import TEMPLATE_COLUMNS, process_files
+
+def make_main_frame(n: int, present: float = 0.8, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    cols = [c for c in TEMPLATE_COLUMNS if rng.random() < present]
+    pool = np.array([f'value {i}' for i in range(200)], dtype=object)
+    df = pd.DataFrame({c: rng.choice(pool, size=n) for c in cols}, dtype=str)
+    df['Period Date'] = '2024-05-08'
+    return df
+
+def assemble_per_column(main_df: pd.DataFrame) -> pd.DataFrame:
+    # The previous step 1: assign 47 columns into an empty frame
+    out = pd.DataFrame(columns=TEMPLATE_COLUMNS)
+    for col in TEMPLATE_COLUMNS:
+        if col in main_df.columns:
+            out[col] = main_df[col]
+        else:
+            out[col] = None
+    return out
+
+def assemble_once(main_df: pd.DataFrame) -> pd.DataFrame:
+    missing = pd.Series(np.full(len(main_df), None, dtype=object), index=main_df.index)
+    cols = {c: main_df[c] if c in main_df.columns else missing for c in TEMPLATE_COLUMNS}
+    return pd.DataFrame(cols, index=main_df.index, copy=False)
+
+def measure(fn):
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+def run(rows) -> None:
+    print(f"{'rows':>9} {'stage':>22} {'seconds':>8} {'peak MiB':>9}")
+    for n in rows:
+        df = make_main_frame(n)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.PerformanceWarning)
+            stages = {
+                'step 1 per-column': lambda: assemble_per_column(df),
+                'step 1 single build': lambda: assemble_once(df),
+                'process_files': lambda: process_files(df, None),
+            }
+            for label, fn in stages.items():
+                elapsed, peak = measure(fn)
+                print(f"{n:>9} {label:>22} {elapsed:>8.3f} {peak:>9.1f}")
+        fragmented = [w for w in caught if issubclass(w.category, pd.errors.PerformanceWarning)]
+        print(f"{n:>9} {'fragmentation warnings':>22} {len(fragmented):>8}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 500_000])
+    args = parser.parse_args()
+    run(args.rows)
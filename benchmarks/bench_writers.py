@@ -0,0 +1,53 @@
+"""Benchmark: to_excel_bytes engines, wall time and peak traced memory.
+
+    python -m benchmarks.bench_writers --rows 10000 100000
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from core import TEMPLATE_COLUMNS
+from writers import EXCEL_ENGINES, to_excel_bytes
+
+def make_output_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    pool = np.array([f'value {i}' for i in range(500)], dtype=object)
+    df = pd.DataFrame({c: rng.choice(pool, size=n) for c in TEMPLATE_COLUMNS}, dtype=str)
+    df['Agg Date'] = pd.Timestamp('2024-05-06') + pd.to_timedelta(rng.integers(0, 52, n) * 7, unit='D')
+    return df
+
+def run(rows, engines, measure_memory: bool = True) -> None:
+    print(f"{'rows':>9} {'engine':>20} {'seconds':>8} {'peak MiB':>9} {'size MiB':>9}")
+    for n in rows:
+        df = make_output_frame(n)
+        reference = None
+        for engine in engines:
+            t0 = time.perf_counter()
+            data = to_excel_bytes(df, engine=engine)
+            elapsed = time.perf_counter() - t0
+            # Separate pass: tracemalloc slows pure-Python writers several-fold
+            peak = float('nan')
+            if measure_memory:
+                tracemalloc.start()
+                to_excel_bytes(df, engine=engine)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            # Same cell content regardless of engine
+            roundtrip = pd.read_excel(io.BytesIO(data), dtype=str)
+            if reference is None:
+                reference = roundtrip
+            else:
+                pd.testing.assert_frame_equal(reference, roundtrip)
+            print(f"{n:>9} {engine:>20} {elapsed:>8.2f} {peak / 2**20:>9.1f} {len(data) / 2**20:>9.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--engines', nargs='+', default=list(EXCEL_ENGINES), choices=list(EXCEL_ENGINES))
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass.")
+    args = parser.parse_args()
+    run(args.rows, args.engines, measure_memory=not args.no_memory)
@@ -0,0 +1,174 @@
+"""Regression check: rerun the suite and compare every stage with benchmarks/baseline.json.
+
+A stage regresses when its median wall time, summed over the dataset sizes,
+grows by more than ``--tolerance`` and by more than its noise, or its
+largest traced allocation peak grows by more than ``--memory-tolerance``
+(and by at least ``--min-mib``). A stage's noise is the larger of the two
+runs' fastest-to-slowest spread across repeats, summed over the sizes, and
+at least ``--min-seconds``; so millisecond stages are checked as closely as
+their own run-to-run jitter allows. The per-stage delta table is always
+printed; any regression exits with status 1.
+The rerun uses the baseline's sizes, seed, repeat count, Excel engine and
+XLSX size limit. The default baseline times process_files at 200k rows,
+where most steps take well over their noise, and XLSX only at 10k rows.
+Compare on the machine that recorded the baseline: the environment is
+printed when it differs.
+
+    python -m benchmarks.compare                   # rerun and compare
+    python -m benchmarks.compare --run run.json    # compare a saved suite entry/history instead
+    python -m benchmarks.compare --update --rows 10000 200000 --excel-rows 10000 --repeat 5
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.suite import run_suite
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+BASELINE_ROWS = [10_000, 200_000]
+BASELINE_EXCEL_ROWS = 10_000
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+# Changes below these are noise whatever the ratio (timer resolution and
+# scheduling for time, interpreter overhead for memory)
+MIN_SECONDS = 0.005
+MIN_MIB = 1.0
+ENVIRONMENT_KEYS = ['python', 'pandas', 'platform', 'cpu_count']
+
+def load_entry(path: Path) -> dict:
+    """A suite entry from ``path``: the file itself, or the last entry of a history list."""
+    data = json.loads(path.read_text())
+    return data[-1] if isinstance(data, list) else data
+
+def save_baseline(entry: dict, path: Path = BASELINE_PATH) -> None:
+    path.write_text(json.dumps(entry, indent=1) + '\n')
+
+def _ratio(new, base):
+    if new is None or base is None or not base:
+        return None
+    return new / base - 1
+
+def _with_totals(results: list) -> dict:
+    """``{(rows, step): record}`` plus an ``('all', step)`` record per step.
+
+    The total sums wall time and spread over the sizes and keeps the largest
+    allocation peak, so the largest dataset dominates and small-size jitter
+    averages out. Entries recorded before spreads were kept count as 0.
+    """
+    records = {(r['rows'], r['step']): r for r in results}
+    for r in results:
+        total = records.setdefault(('all', r['step']), {'wall_s': 0.0, 'wall_spread_s': 0.0,
+                                                         'alloc_peak_mib': None})
+        total['wall_s'] += r['wall_s']
+        total['wall_spread_s'] += r.get('wall_spread_s') or 0.0
+        if r.get('alloc_peak_mib') is not None:
+            total['alloc_peak_mib'] = max(total['alloc_peak_mib'] or 0.0, r['alloc_peak_mib'])
+    return records
+
+def compare_entries(baseline: dict, current: dict, tolerance: float = TIME_TOLERANCE,
+                    memory_tolerance: float = MEMORY_TOLERANCE, min_seconds: float = MIN_SECONDS,
+                    min_mib: float = MIN_MIB) -> pd.DataFrame:
+    """Per ``(rows, step)`` delta table with a ``status`` column.
+
+    Each step's verdict ('ok', 'slower', 'more memory') is on its ``rows='all'``
+    total over the sizes; per-size rows show the deltas for information. Steps
+    only in one of the entries are listed as 'new' or 'missing' and do not
+    count as regressions.
+    """
+    sizes = {r['rows'] for r in baseline['results']} & {r['rows'] for r in current['results']}
+    base = _with_totals([r for r in baseline['results'] if r['rows'] in sizes])
+    new = _with_totals([r for r in current['results'] if r['rows'] in sizes])
+    rows = []
+    for key in [*base, *(k for k in new if k not in base)]:
+        b, n = base.get(key), new.get(key)
+        row = {'rows': key[0], 'step': key[1],
+               'base_s': b and b['wall_s'], 'new_s': n and n['wall_s'],
+               'base_mib': b and b.get('alloc_peak_mib'), 'new_mib': n and n.get('alloc_peak_mib')}
+        row['noise_s'] = max([min_seconds, *(r.get('wall_spread_s') or 0.0 for r in (b, n) if r)])
+        row['time_delta'] = _ratio(row['new_s'], row['base_s'])
+        row['mem_delta'] = _ratio(row['new_mib'], row['base_mib'])
+        if b is None or n is None:
+            status = 'new' if b is None else 'missing'
+        elif key[0] != 'all':
+            status = ''
+        else:
+            problems = []
+            if (row['time_delta'] is not None and row['time_delta'] > tolerance
+                    and row['new_s'] - row['base_s'] > row['noise_s']):
+                problems.append('slower')
+            if (row['mem_delta'] is not None and row['mem_delta'] > memory_tolerance
+                    and row['new_mib'] - row['base_mib'] >= min_mib):
+                problems.append('more memory')
+            status = ', '.join(problems) or 'ok'
+        rows.append({**row, 'status': status})
+    return pd.DataFrame(rows).set_index(['rows', 'step'])
+
+def regressions(table: pd.DataFrame) -> pd.DataFrame:
+    return table[~table['status'].isin(['ok', '', 'new', 'missing'])]
+
+def format_table(table: pd.DataFrame) -> str:
+    shown = table.copy()
+    for col in ('time_delta', 'mem_delta'):
+        shown[col] = shown[col].map(lambda v: '' if pd.isna(v) else f"{v:+.1%}")
+    for col in ('base_s', 'new_s', 'noise_s', 'base_mib', 'new_mib'):
+        shown[col] = shown[col].map(lambda v: '' if pd.isna(v) else f"{v:.3f}")
+    return shown.to_string()
+
+def environment_changes(baseline: dict, current: dict) -> list:
+    return [f"{key}: {baseline.get(key)} -> {current.get(key)}" for key in ENVIRONMENT_KEYS
+            if baseline.get(key) != current.get(key)]
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--run', type=Path,
+                        help="Compare this saved suite entry (or history file) instead of rerunning.")
+    parser.add_argument('--update', action='store_true',
+                        help="Rerun the suite and overwrite the baseline instead of comparing.")
+    parser.add_argument('--rows', type=int, nargs='+',
+                        help=f"Sizes for --update (default {BASELINE_ROWS}).")
+    parser.add_argument('--excel-rows', type=int, default=BASELINE_EXCEL_ROWS,
+                        help="Largest size timed with the XLSX stage, for --update.")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per size for --update.")
+    parser.add_argument('--tolerance', type=float, default=TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS,
+                        help="Smallest time noise assumed for any stage.")
+    parser.add_argument('--min-mib', type=float, default=MIN_MIB)
+    args = parser.parse_args(argv)
+
+    if args.update:
+        entry = run_suite(args.rows or BASELINE_ROWS, repeat=args.repeat,
+                          excel_rows=args.excel_rows)
+        save_baseline(entry, args.baseline)
+        print(f"\nwrote {args.baseline}")
+        return 0
+
+    baseline = load_entry(args.baseline)
+    if args.run is not None:
+        current = load_entry(args.run)
+    else:
+        current = run_suite(sorted({r['rows'] for r in baseline['results']}),
+                            repeat=baseline['repeat'], engine=baseline['engine'],
+                            seed=baseline.get('seed', 0), excel_rows=baseline.get('excel_rows'))
+    for change in environment_changes(baseline, current):
+        print(f"warning: environment differs from the baseline ({change})", file=sys.stderr)
+
+    table = compare_entries(baseline, current, args.tolerance, args.memory_tolerance,
+                            args.min_seconds, args.min_mib)
+    print(f"\nbaseline {baseline.get('commit')} ({baseline.get('timestamp')}) vs "
+          f"{current.get('commit')} ({current.get('timestamp')})")
+    print(format_table(table))
+    failed = regressions(table)
+    if len(failed):
+        print(f"\n{len(failed)} stage(s) regressed beyond {args.tolerance:.0%} time / "
+              f"{args.memory_tolerance:.0%} memory tolerance")
+        return 1
+    print("\nno regressions")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
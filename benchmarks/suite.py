@@ -0,0 +1,143 @@
+"""Benchmark suite: per-stage timings of process_files and to_excel_bytes on synthetic reports.
+
+Every invocation appends one entry (environment plus one record per rows x
+stage) to a JSON history file. Wall and CPU time are the median of
+``--repeat`` untraced runs (``wall_min_s`` keeps the fastest and
+``wall_spread_s`` the gap to the slowest); each run starts with an empty
+dedupe memo and, as in timeit, no garbage collection. ``alloc_peak_mib``
+comes from one extra run under tracemalloc. ``--excel-rows`` limits the XLSX
+stage, by far the slowest, to sizes up to that many rows.
+benchmarks/compare.py keeps one such entry as the committed baseline and
+checks new runs against it.
+
+    python -m benchmarks.suite --rows 10000 100000 500000 2000000 --excel-rows 500000
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from core import _dedupe_str, build_dq_lookup, process_files
+from instrument import StepRecorder, peak_rss_mb, timings_table
+from synth import make_dq_frame, make_main_frame
+from writers import DEFAULT_EXCEL_ENGINE, EXCEL_MAX_ROWS, to_excel_bytes
+
+HISTORY_PATH = Path(__file__).with_name('history.json')
+DEFAULT_ROWS = [10_000, 100_000, 500_000, 2_000_000]
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment() -> dict:
+    return {
+        'timestamp': pd.Timestamp.now(tz='UTC').isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def run_stages(main_df: pd.DataFrame, dq_df: pd.DataFrame, engine: str,
+               excel: bool = True) -> list:
+    """One pass over every stage (XLSX only if ``excel``); returns StepRecorder records."""
+    recorder = StepRecorder()
+    with recorder.step('build dq lookup', len(dq_df)):
+        dq_lookup = build_dq_lookup(dq_df)
+    with recorder.step('process_files (total)', len(main_df)):
+        out, stats = process_files(main_df, None, dq_lookup=dq_lookup)
+    # The streaming engines split oversized frames across sheets; pandas' 'openpyxl' cannot
+    if excel and (engine != 'openpyxl' or len(out) < EXCEL_MAX_ROWS):
+        with recorder.step(f'to_excel_bytes ({engine})', len(out)):
+            to_excel_bytes(out, engine=engine)
+    dq_step, total, *export = recorder.records
+    return [dq_step, *stats['timings'], total, *export]
+
+def _cold_run(main_df: pd.DataFrame, dq_df: pd.DataFrame, engine: str, excel: bool) -> list:
+    # The dedupe memo is process-wide: without clearing it, every run after
+    # the first would time cache hits instead of the dedupe work
+    _dedupe_str.cache_clear()
+    gc.collect()
+    gc.disable()
+    try:
+        return run_stages(main_df, dq_df, engine, excel)
+    finally:
+        gc.enable()
+
+def measure(n: int, repeat: int = 1, trace_memory: bool = True,
+            engine: str = DEFAULT_EXCEL_ENGINE, seed: int = 0, excel: bool = True) -> list:
+    """Records for one dataset size: median-of-``repeat`` times, traced allocation peaks."""
+    main_df = make_main_frame(n, seed=seed)
+    dq_df = make_dq_frame(main_df, seed=seed + 1)
+    records, walls, cpus = {}, {}, {}
+    for _ in range(repeat):
+        for r in _cold_run(main_df, dq_df, engine, excel):
+            records.setdefault(r['step'], r)
+            walls.setdefault(r['step'], []).append(r['wall_s'])
+            cpus.setdefault(r['step'], []).append(r['cpu_s'])
+    for step, r in records.items():
+        r['wall_s'] = statistics.median(walls[step])
+        r['wall_min_s'] = min(walls[step])
+        r['wall_spread_s'] = max(walls[step]) - min(walls[step])
+        r['cpu_s'] = statistics.median(cpus[step])
+    if trace_memory:
+        _dedupe_str.cache_clear()
+        tracemalloc.start()
+        try:
+            for r in run_stages(main_df, dq_df, engine, excel):
+                records[r['step']]['alloc_peak_mib'] = r['alloc_peak_mib']
+        finally:
+            tracemalloc.stop()
+    return [{'rows': n, **r} for r in records.values()]
+
+def run_suite(rows=DEFAULT_ROWS, repeat: int = 1, trace_memory: bool = True,
+              engine: str = DEFAULT_EXCEL_ENGINE, seed: int = 0, excel_rows: int | None = None,
+              verbose: bool = True) -> dict:
+    """Benchmark every size in ``rows`` (XLSX up to ``excel_rows``); returns a history entry."""
+    entry = {**environment(), 'engine': engine, 'repeat': repeat, 'seed': seed,
+             'excel_rows': excel_rows, 'results': []}
+    for n in rows:
+        t0 = time.perf_counter()
+        records = measure(n, repeat=repeat, trace_memory=trace_memory, engine=engine, seed=seed,
+                          excel=excel_rows is None or n <= excel_rows)
+        entry['results'].extend(records)
+        if verbose:
+            peak_rss = peak_rss_mb()
+            print(f"\n{n:,} rows ({time.perf_counter() - t0:.1f}s"
+                  + (f", process peak RSS {peak_rss:,.0f} MiB)" if peak_rss is not None else ")"))
+            print(timings_table([{k: v for k, v in r.items() if k != 'rows'}
+                                 for r in records]).to_string())
+    return entry
+
+def append_history(entry: dict, path: Path = HISTORY_PATH) -> None:
+    history = json.loads(path.read_text()) if path.exists() else []
+    history.append(entry)
+    path.write_text(json.dumps(history, indent=1) + '\n')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--engine', default=DEFAULT_EXCEL_ENGINE)
+    parser.add_argument('--excel-rows', type=int,
+                        help="Time the XLSX stage only for sizes up to this many rows.")
+    parser.add_argument('--no-trace', action='store_true',
+                        help="Skip the tracemalloc pass (alloc_peak_mib stays empty).")
+    parser.add_argument('--history', type=Path, default=HISTORY_PATH)
+    args = parser.parse_args()
+    entry = run_suite(args.rows, repeat=args.repeat, trace_memory=not args.no_trace,
+                      engine=args.engine, excel_rows=args.excel_rows)
+    append_history(entry, args.history)
+    print(f"\nappended to {args.history}")
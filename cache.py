@@ -0,0 +1,127 @@
+# cache.py
+"""In-process caches that survive Streamlit reruns."""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from core import COUNTRY_MAP_PATH
+from uploads import upload_view
+
+PARSED_CACHE_MAX_ENTRIES = 8
+PARSED_CACHE_MAX_BYTES = 2 * 1024**3
+
+def content_hash(upload) -> str:
+    """Digest of an uploaded file's bytes, read through a memoryview (no copy)."""
+    with upload_view(upload) as view:
+        return hashlib.blake2b(view, digest_size=20).hexdigest()
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+class ParsedFrameCache:
+    """Thread-safe LRU of parsed DataFrames bounded by entry count and total bytes.
+
+    Cached frames are shared between reruns and sessions; callers must not
+    mutate them in place.
+    """
+
+    def __init__(self, max_entries: int = PARSED_CACHE_MAX_ENTRIES,
+                 max_bytes: int = PARSED_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (df, nbytes)
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, df: pd.DataFrame) -> None:
+        size = frame_nbytes(df)
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            self._entries[key] = (df, size)
+            self._nbytes += size
+            while len(self._entries) > self.max_entries or self._nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._nbytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """Digest of the pipeline sources, so memoized results never outlive a code change."""
+    digest = hashlib.blake2b(digest_size=8)
+    for name in ('core.py', 'readers.py', 'writers.py'):
+        digest.update(Path(__file__).with_name(name).read_bytes())
+    # The table actually loaded, which PEP_COUNTRY_MAP_PATH may point elsewhere
+    digest.update(Path(COUNTRY_MAP_PATH).read_bytes())
+    return digest.hexdigest()
+
+class RunMemo:
+    """Per-session memo of process_files results and their export payloads.
+
+    A run is keyed by (main hash, DQ hash, keep_audit_col, use_dq_history,
+    dtype backend, category threshold, code_version()) and holds
+    ``result_df``, ``stats``, ``notes`` and the lazily built ``exports``. Only
+    the most recent ``max_runs`` runs are kept.
+    """
+
+    def __init__(self, max_runs: int = 2):
+        self.max_runs = max_runs
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            run = self._runs.get(key)
+            if run is not None:
+                self._runs.move_to_end(key)
+            return run
+
+    def put(self, key, result_df: pd.DataFrame, stats: dict, notes=(), **extras) -> dict:
+        run = {'result_df': result_df, 'stats': stats, 'notes': list(notes), 'exports': {},
+               'lock': threading.Lock(), **extras}
+        with self._lock:
+            self._runs[key] = run
+            self._runs.move_to_end(key)
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+        return run
+
+    def export(self, run: dict, fmt, build) -> bytes:
+        """Bytes for ``fmt`` of ``run``, calling ``build(result_df)`` only the first time."""
+        # Per-run lock: a slow export must not block reruns looking up other runs
+        with run['lock']:
+            data = run['exports'].get(fmt)
+            if data is None:
+                data = build(run['result_df'])
+                run['exports'][fmt] = data
+            return data
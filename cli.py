@@ -0,0 +1,84 @@
+# cli.py
+"""Headless batch run: clean many weekly main/DQ report pairs at once.
+
+    python cli.py --main reports/main_*.xlsx --dq reports/dq_*.xlsx --out out/ --combined
+"""
+import argparse
+import multiprocessing
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from batch import (
+    BATCH_FORMATS, batch_summary, bol_overlap, pair_by_week, per_week_outputs, run_batch,
+    week_from_main, week_from_name, write_combined,
+)
+from core import CATEGORY_MAX_UNIQUE
+
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Clean many weekly main/DQ report pairs.")
+    parser.add_argument('--main', nargs='+', required=True, type=Path,
+                        help="Main workbooks (Data Availability Trend by Selected Dimensions).")
+    parser.add_argument('--dq', nargs='*', default=[], type=Path,
+                        help="DQ workbooks (Data Quality by Carrier), matched to mains by week, "
+                             "or by shared BOLs when the name has no date.")
+    parser.add_argument('--out', type=Path, required=True,
+                        help="Output directory, or the output file with --combined.")
+    parser.add_argument('--combined', action='store_true',
+                        help="Write one file with every week instead of one file per week.")
+    parser.add_argument('--format', choices=list(BATCH_FORMATS), default='xlsx')
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Pairs processed concurrently, one process each.")
+    parser.add_argument('--keep-audit', action='store_true',
+                        help="Keep the 'Tracking Error (from DQ)' audit column.")
+    parser.add_argument('--dtype-backend', choices=['object', 'arrow'], default='object')
+    parser.add_argument('--pandas-reader', action='store_true',
+                        help="Use pd.read_excel instead of the streaming reader.")
+    parser.add_argument('--category-max-unique', type=int, default=CATEGORY_MAX_UNIQUE)
+    args = parser.parse_args(argv)
+
+    # File names give the week; mains without one are dated by their Period Date
+    mains = {}
+    for path in args.main:
+        week = week_from_name(path.name)
+        mains[str(path)] = week if week is not None else week_from_main(path)
+    dqs = {str(path): week_from_name(path.name) for path in args.dq}
+    # DQ files without a week in their name are matched by shared BOLs
+    pairs, unmatched = pair_by_week(mains, dqs, overlap=bol_overlap(lambda name: name))
+    for name, reason in unmatched:
+        print(f"warning: skipped DQ file {name}: {reason}", file=sys.stderr)
+
+    payloads = {name: name for name in (*mains, *dqs)}
+    options = dict(streaming=not args.pandas_reader, dtype_backend=args.dtype_backend,
+                   keep_audit_col=args.keep_audit, category_max_unique=args.category_max_unique)
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            results, totals = run_batch(pairs, payloads, executor=pool, **options)
+    else:
+        results, totals = run_batch(pairs, payloads, **options)
+
+    if args.combined:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        write_combined(results, args.out, args.format)
+        print(f"wrote {args.out}")
+    else:
+        args.out.mkdir(parents=True, exist_ok=True)
+        for name, data in per_week_outputs(results, args.format):
+            (args.out / name).write_bytes(data)
+            print(f"wrote {args.out / name}")
+
+    for r in results:
+        for note in r['notes']:
+            print(f"warning: {r['main']}: {note}", file=sys.stderr)
+    print(batch_summary(results).to_string(index=False))
+    print(f"{totals['weeks']} pairs, {totals['rows']:,} rows in {totals['seconds']:.1f}s "
+          f"({totals['rows_per_second']:,.0f} rows/s, "
+          f"{totals['input_mib_per_second']:.2f} MiB/s of input)")
+    return 1 if totals['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,535 @@
+# core.py
+"""Core transformation for the Pepsico weekly report (no Streamlit dependency)."""
+import csv
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from instrument import StepRecorder, merge_timings
+
+# ===============================
+# Helpers & Core Transformation
+# ===============================
+
+TEMPLATE_COLUMNS = [
+    'Tenant Name', 'Shipment Mode', 'Agg Date', 'Carrier Name', 'Destination Country',
+    'Drop-off Region', 'Region Pickup', 'Pickup Country', 'Tracking Method', 'Tracking Type',
+    'Period Date', 'Destination Country.1', 'Final Status Reason', 'P44 Shipment ID',
+    'Pickup Country.1', 'Tracked', 'Active Equipment ID', 'Attr1 Name', 'Attr1 Value',
+    'Attr2 Name', 'Attr2 Value', 'Attr3 Name', 'Attr3 Value', 'Attr4 Name', 'Attr4 Value',
+    'Attr5 Name', 'Attr5 Value', 'Bill of Lading', 'Destination Name', 'Dropoff Arrival Milestone',
+    'Dropoff City State', 'Dropoff Departure Milestone', 'Ft Shipment Error',
+    'Has Equipment ID (Yes / No)', 'Historical Equipment ID', 'IS_PING_COMPLETE',
+    'P44 Carrier ID', 'Pickup Arrival Milestone', 'Pickup City State',
+    'Pickup Departure Milestone', 'Pickup State', 'PICKUP_ARRIVAL_STATUS_30_MIN',
+    'Pickup Name', 'Tenant ID', 'Tl Equipment ID Source', 'TOTAL_STOPS', 'TRACKING_METHOD_RCA'
+]
+
+# Source columns process_files reads from the main upload
+MAIN_SOURCE_COLUMNS = TEMPLATE_COLUMNS + ['Shipment Tracking Type', 'Shipment Tracking Method']
+
+# Columns build_dq_lookup needs from the DQ upload (matched ignoring case/spaces)
+DQ_SOURCE_COLUMNS = ["Bill of Lading", "Tracking Error"]
+
+# ISO 3166-1 alpha-2 code -> name; point PEP_COUNTRY_MAP_PATH at another CSV
+# with ``code`` and ``name`` columns to override
+COUNTRY_MAP_PATH = Path(os.environ.get(
+    "PEP_COUNTRY_MAP_PATH", Path(__file__).with_name("country_codes.csv")
+))
+COUNTRY_COLUMNS = ['Destination Country', 'Pickup Country', 'Destination Country.1', 'Pickup Country.1']
+
+def load_country_map(path=COUNTRY_MAP_PATH) -> dict:
+    # csv rather than pandas so 'NA' (Namibia) is not read as missing
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['code'].strip(): row['name'].strip()
+                for row in csv.DictReader(f) if row['code'].strip()}
+
+COUNTRY_MAP = load_country_map()
+
+# Columns with at most this many distinct values become categoricals in
+# process_files (None/0 disables). Columns rewritten after the conversion are
+# never categorized.
+CATEGORY_MAX_UNIQUE = 1000
+CATEGORY_SAMPLE_ROWS = 5000
+_CATEGORY_EXCLUDE = frozenset([
+    'Agg Date', 'Bill of Lading', 'Ft Shipment Error',
+    *[f'Attr{i} {part}' for i in range(1, 6) for part in ('Name', 'Value')],
+])
+
+EXPECTED_ATTR_MAPPING = {
+    'Business Unit': 'Attr1',
+    'PO': 'Attr2',
+    'TMSTOPID': 'Attr3',
+    'Order Type': 'Attr4',
+    'GTMSLOAT': 'Attr5'
+}
+
+def dedupe_semicolon_list(value):
+    if pd.isna(value):
+        return value
+    if isinstance(value, str):
+        # normalize commas to semicolons, split, strip, unique-preserve-order
+        for sep in [',', ';']:
+            value = value.replace(sep, ';')
+        parts = [p.strip() for p in value.split(';') if p.strip()]
+        unique = list(dict.fromkeys(parts))
+        return ';'.join(unique)
+    return value
+
+# Bounded memo for dedupe_semicolon_column; shared by all Attr Value columns and
+# kept across Streamlit reruns since PO/TMSTOPID lists recur week over week.
+DEDUPE_MEMO_SIZE = 200_000
+
+@lru_cache(maxsize=DEDUPE_MEMO_SIZE)
+def _dedupe_str(value: str) -> str:
+    if ',' not in value and ';' not in value:
+        return value.strip()
+    return dedupe_semicolon_list(value)
+
+def dedupe_semicolon_column(s: pd.Series) -> pd.Series:
+    """Column-wise ``s.apply(dedupe_semicolon_list)``: dedupe each unique value once.
+
+    String-dtype columns (str, string[pyarrow]) keep their dtype: only the
+    deduped uniques are converted and taken back onto the codes.
+    """
+    codes, uniques = pd.factorize(s)
+    if isinstance(s.dtype, pd.StringDtype):
+        # One missing marker per dtype, so take() can refill it
+        cleaned = pd.array([_dedupe_str(u) for u in uniques], dtype=s.dtype)
+        return pd.Series(cleaned.take(codes, allow_fill=True), index=s.index, name=s.name)
+    cleaned = np.array(
+        [_dedupe_str(u) if isinstance(u, str) else u for u in uniques] + [None],
+        dtype=object,
+    )
+    values = cleaned.take(codes)
+    missing = codes == -1
+    if missing.any():
+        # factorize folds None/NaN together; keep the original missing marker
+        values[missing] = s.to_numpy(dtype=object)[missing]
+    return pd.Series(values, index=s.index, name=s.name, dtype=object)
+
+ATTR_SLOTS = [f'Attr{i}' for i in range(1, 6)]
+ATTR_COLUMNS = [f'{slot} {part}' for slot in ATTR_SLOTS for part in ('Name', 'Value')]
+
+def _rearrange_attrs(columns) -> dict:
+    """Column-wise reference.rearrange_attrs_row as ``{column: Series}``.
+
+    ``columns`` is a DataFrame or dict of Series. Each source slot is resolved
+    against EXPECTED_ATTR_MAPPING for all rows at once; later slots overwrite
+    earlier ones, exactly like the row-wise loop. Slots are combined with
+    Series.mask, so string-dtype columns are never converted to object.
+    """
+    hits = {}
+    for slot in ATTR_SLOTS:
+        # Names repeat heavily; map the distinct ones only
+        codes, uniques = pd.factorize(columns[f'{slot} Name'])
+        targets = np.array([EXPECTED_ATTR_MAPPING.get(u) for u in uniques] + [None],
+                           dtype=object).take(codes)
+        for target in ATTR_SLOTS:
+            hit = targets == target
+            if hit.any():
+                hits.setdefault(target, []).append((slot, hit))
+    out = {}
+    for col in ATTR_COLUMNS:
+        target, part = col.split(' ')
+        like = columns[col]
+        result = pd.Series('', index=like.index, name=col,
+                           dtype=like.dtype if isinstance(like.dtype, pd.StringDtype) else object)
+        for slot, hit in hits.get(target, []):
+            result = result.mask(hit, columns[f'{slot} {part}'])
+        out[col] = result
+    return out
+
+def _keep_dtype(values: pd.Series, like: pd.Series) -> pd.Series:
+    """Cast a derived object column back to the dtype of the column it replaces.
+
+    Non-object inputs (e.g. string[pyarrow]) are restored; object columns stay
+    object rather than taking whatever pandas infers from the new values, so
+    chunks and partitions of one input always agree.
+    """
+    if values.dtype == like.dtype or like.dtype == object:
+        return values
+    return values.astype(like.dtype)
+
+def categorize_low_cardinality(df, max_unique: int | None = CATEGORY_MAX_UNIQUE,
+                               exclude=_CATEGORY_EXCLUDE) -> list:
+    """Convert low-cardinality columns of ``df`` (DataFrame or dict of Series) to categoricals in place.
+
+    A column qualifies when it has at most ``max_unique`` distinct non-null
+    values and fewer than half as many as rows. A head sample rejects
+    high-cardinality columns before the full factorize. Returns the converted
+    column names.
+    """
+    if not max_unique:
+        return []
+    converted = []
+    for col in list(df):
+        s = df[col]
+        if col in exclude or not (s.dtype == object or isinstance(s.dtype, pd.StringDtype)):
+            continue
+        if s.iloc[:CATEGORY_SAMPLE_ROWS].nunique() > max_unique:
+            continue
+        codes, uniques = pd.factorize(s)
+        if not len(uniques) or len(uniques) > max_unique or 2 * len(uniques) >= len(s):
+            continue
+        df[col] = pd.Series(pd.Categorical.from_codes(codes, categories=uniques),
+                            index=s.index, name=s.name)
+        converted.append(col)
+    return converted
+
+def _map_categories(s: pd.Series, mapping: dict) -> pd.Series:
+    """``s.map(mapping).fillna(s)`` for a categorical, translating categories only."""
+    if not len(s.cat.categories):
+        return s
+    renamed = [mapping.get(c, c) for c in s.cat.categories]
+    # Two codes may translate to the same name ('DE' and 'Germany'), so re-factorize
+    remap, categories = pd.factorize(pd.Index(renamed, dtype=s.cat.categories.dtype))
+    codes = s.cat.codes.to_numpy()
+    new_codes = np.where(codes >= 0, remap[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(new_codes, categories=categories),
+                     index=s.index, name=s.name)
+
+def translate_values(s: pd.Series, mapping: dict) -> pd.Series:
+    """``s.map(mapping).fillna(s)`` computed once per distinct value (factorize -> map -> take)."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return _map_categories(s, mapping)
+    codes, uniques = pd.factorize(s)
+    translated = np.array([mapping.get(u, u) for u in uniques] + [None], dtype=object)
+    values = translated.take(codes)
+    missing = codes == -1
+    if missing.any():
+        values[missing] = s.to_numpy(dtype=object)[missing]
+    return _keep_dtype(pd.Series(values, index=s.index, name=s.name, dtype=object), s)
+
+def monday_of_week(series_dt: pd.Series) -> pd.Series:
+    # Robust: Monday = date - timedelta(weekday)
+    return (series_dt - pd.to_timedelta(series_dt.dt.weekday, unit='D')).dt.normalize()
+
+def _norm_bol(s):
+    if pd.isna(s):
+        return None
+    return str(s).strip().upper()
+
+def _non_ascii_mask(text: pd.Series) -> np.ndarray:
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return text.str.contains(r'[^\x00-\x7f]', regex=True, na=False).to_numpy(dtype=bool)
+    is_ascii = pc.string_is_ascii(pa.array(text, from_pandas=True))
+    return ~pc.fill_null(is_ascii, True).to_numpy(zero_copy_only=False)
+
+def _norm_bol_series(s: pd.Series) -> pd.Series:
+    """Vectorized ``s.map(_norm_bol)``: missing stays missing, else str(x).strip().upper()."""
+    missing = s.isna().to_numpy()
+    text = s.astype(str)
+    keys = text.str.strip().str.upper()
+    # Arrow's case mapping differs from str.upper() outside ASCII ('ß' -> 'ẞ', not 'SS')
+    non_ascii = _non_ascii_mask(text) & ~missing
+    if non_ascii.any():
+        keys.iloc[np.flatnonzero(non_ascii)] = np.array(
+            [v.strip().upper() for v in text[non_ascii]], dtype=object)
+    if missing.any():
+        keys = keys.where(~missing)
+    return keys
+
+def _norm_header(name) -> str:
+    return " ".join(str(name).lower().split())
+
+class HeaderIndex:
+    """Normalized (lower-cased, space-collapsed) header -> actual column name.
+
+    Built once per input so every lookup is a dict hit. ``resolve`` prefers an
+    exact match and otherwise returns the first column whose normalized name
+    matches.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._exact = set(self.columns)
+        self._normalized = {}
+        for c in self.columns:
+            self._normalized.setdefault(_norm_header(c), c)
+
+    def resolve(self, name, prefer_exact: bool = True):
+        if prefer_exact and name in self._exact:
+            return name
+        return self._normalized.get(_norm_header(name))
+
+    def resolve_all(self, names) -> dict:
+        """``{name: actual}`` for each of ``names`` found in the index."""
+        found = {}
+        for name in names:
+            actual = self.resolve(name)
+            if actual is not None:
+                found[name] = actual
+        return found
+
+def build_dq_lookup(dq_df: pd.DataFrame) -> pd.Series:
+    """BOL key -> Tracking Error from the DQ file (first occurrence of each BOL wins)."""
+    headers = HeaderIndex(dq_df.columns)
+    # First normalized match, as the DQ lookup has always resolved its headers
+    bol_col, err_col = (headers.resolve(name, prefer_exact=False) for name in DQ_SOURCE_COLUMNS)
+    if bol_col is None or err_col is None:
+        raise KeyError(f"Required columns not found in DQ file. Have: {list(dq_df.columns)}")
+
+    keyed = pd.DataFrame({
+        '__BOL_KEY__': _norm_bol_series(dq_df[bol_col]),
+        '__TRACKING_ERROR__': dq_df[err_col],
+    })
+    return (
+        keyed.dropna(subset=['__BOL_KEY__'])
+             .drop_duplicates(subset=['__BOL_KEY__'])
+             .set_index('__BOL_KEY__')['__TRACKING_ERROR__']
+    )
+
+def process_files(main_df: pd.DataFrame, dq_df: pd.DataFrame | None, keep_audit_col: bool = False,
+                  dq_lookup: pd.Series | None = None, dq_index=None,
+                  category_max_unique: int | None = CATEGORY_MAX_UNIQUE,
+                  country_map: dict | None = None, date_format: str | None = None):
+    """Run steps 1-7 on ``main_df``.
+
+    ``dq_lookup`` (from build_dq_lookup) can be passed instead of ``dq_df`` so
+    callers processing many chunks build the DQ index only once. ``dq_index``
+    (a dq_index.DQIndex) supplies errors from earlier weeks' DQ uploads for
+    BOLs the current lookup does not cover. Low-cardinality columns are
+    stored as categoricals (see categorize_low_cardinality). ``country_map``
+    defaults to COUNTRY_MAP. ``date_format`` is passed to pd.to_datetime for
+    Period Date; by default pandas infers it from the first value.
+    """
+    if dq_lookup is None and dq_df is not None:
+        dq_lookup = build_dq_lookup(dq_df)
+    if country_map is None:
+        country_map = COUNTRY_MAP
+
+    # Headers are matched ignoring case and extra spaces
+    source = HeaderIndex(main_df.columns).resolve_all(MAIN_SOURCE_COLUMNS)
+
+    # Every step below replaces entries of ``cols`` (column -> Series) and the
+    # output frame is built once at the end, instead of writing into a
+    # DataFrame column by column.
+    index = main_df.index
+    n = len(index)
+    recorder = StepRecorder()
+    step = recorder.step
+
+    # 1) Start from template columns structure
+    with step('1 template columns', n):
+        missing = pd.Series(np.full(n, None, dtype=object), index=index)
+        cols = {}
+        for col in TEMPLATE_COLUMNS:
+            cols[col] = main_df[source[col]] if col in source else missing
+
+    # 2) Manual renames (copy from Shipment Tracking Type/Method if present)
+    with step('2 tracking renames', n):
+        if 'Shipment Tracking Type' in source:
+            cols['Tracking Type'] = main_df[source['Shipment Tracking Type']]
+        if 'Shipment Tracking Method' in source:
+            cols['Tracking Method'] = main_df[source['Shipment Tracking Method']]
+
+    # 3) Agg Date from Period Date (week starting Monday)
+    with step('3 agg date', n):
+        pdts = pd.to_datetime(cols['Period Date'], errors='coerce', format=date_format)
+        cols['Agg Date'] = monday_of_week(pdts)
+        agg_nats = int(pdts.isna().sum())
+
+    with step('categoricals', n):
+        categorize_low_cardinality(cols, category_max_unique)
+
+    # 4) Country code mapping
+    with step('4 country codes', n):
+        for col in COUNTRY_COLUMNS:
+            cols[col] = translate_values(cols[col], country_map)
+
+    # 5) Attribute realignment
+    with step('5 attr realignment', n):
+        for col, values in _rearrange_attrs(cols).items():
+            cols[col] = _keep_dtype(values, cols[col])
+
+    # 6) De-duplicate AttrX Value lists
+    with step('6 attr dedupe', n):
+        for i in range(1, 6):
+            c = f'Attr{i} Value'
+            cols[c] = _keep_dtype(dedupe_semicolon_column(cols[c]), cols[c])
+
+    # 7) VLOOKUP-style update from DQ (if provided)
+    updated_count = 0
+    if dq_lookup is not None or dq_index is not None:
+        with step('7 dq lookup', n) as record:
+            bol_keys = _norm_bol_series(cols['Bill of Lading'])
+            errors = cols['Ft Shipment Error']
+            mask_not_identified = (
+                errors.astype(str).str.strip().str.casefold().eq('not identified')
+            )
+
+            if dq_index is not None:
+                known = dq_lookup if dq_lookup is not None else pd.Series(dtype=object)
+                # Only keys a history hit can fill, unless the audit column shows every BOL
+                wanted = bol_keys if keep_audit_col else bol_keys[mask_not_identified]
+                history = dq_index.lookup(wanted[~wanted.isin(known.index)])
+                dq_lookup = pd.concat([known, history]) if len(history) else known
+            mapped_errors = bol_keys[mask_not_identified].map(dq_lookup)
+            idx_to_write = mapped_errors.index[
+                mapped_errors.notna() & mapped_errors.astype(str).str.len().gt(0)
+            ]
+            if len(idx_to_write):
+                # May still be the caller's (possibly cached) column; never write into it
+                errors = errors.copy()
+                errors.loc[idx_to_write] = mapped_errors.loc[idx_to_write]
+                cols['Ft Shipment Error'] = errors
+            updated_count = len(idx_to_write)
+
+            if keep_audit_col:
+                # The lookup's dtype, however many rows matched (partitions must agree)
+                cols['Tracking Error (from DQ)'] = bol_keys.map(dq_lookup).astype(dq_lookup.dtype)
+            # rows_in: Not Identified rows looked up; rows_out: rows updated
+            record['rows_in'], record['rows_out'] = int(mask_not_identified.sum()), updated_count
+
+    with step('build frame', n):
+        # copy=False: every column is already a fresh array or an unmodified input column
+        out = pd.DataFrame(cols, index=index, copy=False)
+
+    return out, {'agg_date_nats': agg_nats, 'ft_error_updates': updated_count,
+                 'timings': recorder.records}
+
+def process_files_chunked(main_chunks, dq_df: pd.DataFrame | None, keep_audit_col: bool = False,
+                          dq_lookup: pd.Series | None = None, dq_index=None,
+                          category_max_unique: int | None = CATEGORY_MAX_UNIQUE,
+                          country_map: dict | None = None):
+    """Process an iterable of main-file row batches, yielding ``(out_chunk, stats)``.
+
+    The DQ lookup is built once up front; every step is row-local, so each batch
+    goes through the same transform as process_files. ``stats`` is cumulative,
+    with step timings summed over the batches so far.
+    """
+    if dq_lookup is None and dq_df is not None:
+        dq_lookup = build_dq_lookup(dq_df)
+    totals = {'rows': 0, 'agg_date_nats': 0, 'ft_error_updates': 0, 'timings': []}
+    date_format = None
+    for chunk in main_chunks:
+        if date_format is None:
+            # Pinned from the first chunk with a usable Period Date, as a single
+            # process_files call would infer it from the column's first value
+            period_date = HeaderIndex(chunk.columns).resolve('Period Date')
+            if period_date is not None:
+                date_format = infer_date_format(chunk[period_date])
+        out, stats = process_files(chunk, None, keep_audit_col=keep_audit_col,
+                                   dq_lookup=dq_lookup, dq_index=dq_index,
+                                   category_max_unique=category_max_unique,
+                                   country_map=country_map, date_format=date_format)
+        totals['rows'] += len(out)
+        totals['agg_date_nats'] += stats['agg_date_nats']
+        totals['ft_error_updates'] += stats['ft_error_updates']
+        totals['timings'] = merge_timings(totals['timings'], stats['timings'])
+        yield out, dict(totals)
+
+# Smallest row range worth shipping to a worker process
+PARALLEL_MIN_ROWS = 20_000
+
+@lru_cache(maxsize=1)
+def _load_shared_lookup(path: str) -> pd.Series:
+    # Each worker unpickles a run's DQ lookup once, not once per partition
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def _release_shared_lookup(hold: float) -> None:
+    # Held briefly so each idle worker takes one of the release tasks
+    _load_shared_lookup.cache_clear()
+    time.sleep(hold)
+
+# Values pd.to_datetime skips when inferring a format; matched exactly, as pandas
+# does not strip them (' ' is not skipped)
+_NAT_STRINGS = frozenset({'', 'NaT', 'nat', 'NAT', 'nan', 'NaN', 'NAN', 'now', 'today'})
+
+def infer_date_format(values: pd.Series) -> str | None:
+    """The format pd.to_datetime would infer for ``values`` ('mixed' if none fits).
+
+    Row ranges of one column can start with differently formatted values, so
+    partitions parse with the format inferred for the whole column.
+    """
+    for value in values.dropna():
+        if isinstance(value, str):
+            if value in _NAT_STRINGS:
+                continue
+            return guess_datetime_format(value) or 'mixed'
+        return None
+    return None
+
+def _process_partition(part: pd.DataFrame, lookup_path: str | None, **kwargs):
+    dq_lookup = _load_shared_lookup(lookup_path) if lookup_path else None
+    return process_files(part, None, dq_lookup=dq_lookup, **kwargs)
+
+def process_files_parallel(main_df: pd.DataFrame, dq_df: pd.DataFrame | None,
+                           keep_audit_col: bool = False, dq_lookup: pd.Series | None = None,
+                           dq_index=None, category_max_unique: int | None = CATEGORY_MAX_UNIQUE,
+                           country_map: dict | None = None, workers: int | None = None,
+                           executor: ProcessPoolExecutor | None = None,
+                           min_partition_rows: int = PARALLEL_MIN_ROWS):
+    """process_files over contiguous row ranges of ``main_df`` on a process pool.
+
+    Every step is row-local, so each of ``workers`` partitions goes through
+    process_files on its own and the results are concatenated in the original
+    order. The DQ lookup is pickled once to a temp file that workers load by
+    path and release after the run. Categoricals are decided on the combined result, so the same columns
+    qualify as in a single-process run. ``executor`` defaults to a pool created
+    for this call; frames under ``2 * min_partition_rows`` rows run in-process.
+    ``stats['timings']`` has the parent's own steps followed by the workers'
+    step timings summed over partitions.
+    """
+    if dq_lookup is None and dq_df is not None:
+        dq_lookup = build_dq_lookup(dq_df)
+    workers = min(workers or os.cpu_count() or 1, len(main_df) // max(min_partition_rows, 1))
+    if workers < 2:
+        return process_files(main_df, None, keep_audit_col=keep_audit_col, dq_lookup=dq_lookup,
+                             dq_index=dq_index, category_max_unique=category_max_unique,
+                             country_map=country_map)
+
+    period_date = HeaderIndex(main_df.columns).resolve('Period Date')
+    date_format = infer_date_format(main_df[period_date]) if period_date is not None else None
+    bounds = np.linspace(0, len(main_df), workers + 1, dtype=int)
+    recorder = StepRecorder()
+    with recorder.step(f'partitions on {workers} workers', len(main_df)), ExitStack() as stack:
+        lookup_path = None
+        if dq_lookup is not None:
+            f = stack.enter_context(tempfile.NamedTemporaryFile(suffix='.pkl'))
+            pickle.dump(dq_lookup, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            lookup_path = f.name
+        stack_owns_executor = executor is None
+        if stack_owns_executor:
+            # Entered last so it shuts down before the lookup file is removed
+            executor = stack.enter_context(ProcessPoolExecutor(workers))
+        futures = [
+            executor.submit(_process_partition, main_df.iloc[start:stop], lookup_path,
+                            keep_audit_col=keep_audit_col, dq_index=dq_index,
+                            category_max_unique=None, country_map=country_map,
+                            date_format=date_format)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        results = [future.result() for future in futures]
+        if lookup_path is not None and not stack_owns_executor:
+            # A long-lived pool would otherwise keep the lookup in its workers between runs;
+            # one that misses its release task drops it when it next loads a lookup
+            for _ in range(getattr(executor, '_max_workers', workers)):
+                executor.submit(_release_shared_lookup, 0.05)
+
+    with recorder.step('concat + categoricals', len(main_df)):
+        out = pd.concat([part for part, _ in results])
+        categorize_low_cardinality(out, category_max_unique,
+                                   exclude=_CATEGORY_EXCLUDE | {'Tracking Error (from DQ)'})
+    stats = {
+        'agg_date_nats': sum(part_stats['agg_date_nats'] for _, part_stats in results),
+        'ft_error_updates': sum(part_stats['ft_error_updates'] for _, part_stats in results),
+        'timings': recorder.records + merge_timings(*(part_stats['timings']
+                                                      for _, part_stats in results)),
+    }
+    return out, stats
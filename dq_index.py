@@ -0,0 +1,104 @@
+# dq_index.py
+"""Persistent BOL -> Tracking Error index accumulated from weekly DQ uploads."""
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+DQ_INDEX_PATH = Path(os.environ.get(
+    "PEP_DQ_INDEX_PATH", Path.home() / ".cache" / "pep-weekly-report" / "dq_index.sqlite3"
+))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dq_errors (
+    bol_key        TEXT PRIMARY KEY,
+    tracking_error TEXT NOT NULL,
+    source         TEXT,
+    week           TEXT,
+    updated_at     TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dq_uploads (
+    source      TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    uploaded_at TEXT NOT NULL
+);
+"""
+
+class DQIndex:
+    """SQLite-backed lookup that process_files can query in place of a DQ upload.
+
+    An upload overwrites the error stored for a BOL only if its report week
+    is the same or later (a week always beats an unknown one), so
+    reprocessing an old week's DQ file never replaces newer errors. Blank
+    errors never replace a known one. A connection is opened per call so the
+    index can be shared across Streamlit's script threads.
+    """
+
+    def __init__(self, path=DQ_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as con:
+            con.executescript(_SCHEMA)
+            columns = {row[1] for row in con.execute("PRAGMA table_info(dq_errors)")}
+            if 'week' not in columns:
+                # Indexes created before rows carried their report week
+                con.execute("ALTER TABLE dq_errors ADD COLUMN week TEXT")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def update(self, dq_lookup: pd.Series, source: str = "", week=None) -> int:
+        """Upsert a build_dq_lookup() Series for report ``week``; returns its non-blank error count.
+
+        Uploads already merged under the same non-empty ``source`` are skipped.
+        """
+        if source and self.has_source(source):
+            return 0
+        errors = dq_lookup[dq_lookup.notna()].astype(str)
+        errors = errors[errors.str.len().gt(0)]
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        week = pd.Timestamp(week).date().isoformat() if week is not None else None
+        rows = ((key, err, source, week, now) for key, err in errors.items())
+        with closing(self._connect()) as con, con:
+            # NULL >= week is not true, so an unknown week never replaces a known one
+            con.executemany(
+                "INSERT INTO dq_errors (bol_key, tracking_error, source, week, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (bol_key) DO UPDATE SET tracking_error = excluded.tracking_error, "
+                "source = excluded.source, week = excluded.week, updated_at = excluded.updated_at "
+                "WHERE dq_errors.week IS NULL OR excluded.week >= dq_errors.week", rows
+            )
+            con.execute("INSERT INTO dq_uploads (source, rows, uploaded_at) VALUES (?, ?, ?)",
+                        (source, len(errors), now))
+        return len(errors)
+
+    def lookup(self, keys) -> pd.Series:
+        """Tracking Error for each known key in ``keys`` (unknown keys are absent)."""
+        keys = [k for k in pd.unique(pd.Series(keys, dtype=object).dropna())]
+        if not keys:
+            return pd.Series(dtype=object)
+        with closing(self._connect()) as con:
+            con.execute("CREATE TEMP TABLE wanted (bol_key TEXT PRIMARY KEY) WITHOUT ROWID")
+            con.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((k,) for k in keys))
+            found = con.execute(
+                "SELECT e.bol_key, e.tracking_error FROM wanted w JOIN dq_errors e USING (bol_key)"
+            ).fetchall()
+        return pd.Series(dict(found), dtype=object)
+
+    def version(self) -> tuple:
+        """Changes whenever an upload is merged, so memoized lookups can be invalidated."""
+        with closing(self._connect()) as con:
+            return tuple(con.execute(
+                "SELECT count(*), max(uploaded_at) FROM dq_uploads").fetchone())
+
+    def has_source(self, source: str) -> bool:
+        with closing(self._connect()) as con:
+            return con.execute("SELECT 1 FROM dq_uploads WHERE source = ? LIMIT 1",
+                               (source,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as con:
+            return con.execute("SELECT count(*) FROM dq_errors").fetchone()[0]
@@ -0,0 +1,219 @@
+# equivalence.py
+"""Differential check: every engine must match reference.reference_process_files.
+
+Random inputs are generated per case from one seed: missing values (None,
+NaN, ''), comma/semicolon lists with stray spaces and repeats, duplicate and
+re-cased BOLs on both sides, 'Not Identified' in odd casing and spacing,
+headers with changed case/spacing or missing altogether, country codes and
+names, mixed Period Date formats and str/object/Arrow dtypes. Output frames
+must hold the same columns, index and values (None, NaN and NA all count as
+missing); categoricals are compared by value and every other column must
+also keep the reference dtype. Stats must match except for timings. The
+first failing case is printed with its seed.
+
+    python equivalence.py --cases 500 --engine process_files chunked parallel
+"""
+import argparse
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core import (
+    COUNTRY_MAP, EXPECTED_ATTR_MAPPING, MAIN_SOURCE_COLUMNS, process_files, process_files_chunked,
+    process_files_parallel,
+)
+from reference import reference_process_files
+
+ERRORS = ['Not Identified', 'not identified', ' NOT IDENTIFIED ', 'Not identified\t',
+          'Not  Identified', 'NotIdentified', 'Late Assignment', '', None, np.nan]
+DQ_ERRORS = ['Carrier Not Onboarded', 'Missing Pings', '', ' ', None, np.nan]
+ATTR_NAMES = [*EXPECTED_ATTR_MAPPING, 'business unit', 'PO ', 'Legacy Ref', '', None, np.nan]
+ITEMS = ['A1', 'a1', 'B2', ' B2', 'C3 ', 'C 3', 'ß', '']
+SEPARATORS = [';', ',', '; ', ' , ', ';;', ',;']
+DATES = ['2024-05-08', '2024-05-12', '05/09/2024', '2024-05-13 10:30:00', '13.05.2024',
+         '2024/05/14', 'not a date', '', ' ', 'NaT', None, np.nan]
+DTYPES = [object, 'str', 'string[pyarrow]']
+
+def _pick(rng, values, n):
+    return [values[i] for i in rng.integers(0, len(values), n)]
+
+def _lists(rng, n):
+    out = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.1:
+            out.append(None if roll < 0.05 else np.nan)
+            continue
+        items = _pick(rng, ITEMS, int(rng.integers(0, 5)))
+        text = ''
+        for i, item in enumerate(items):
+            text += (SEPARATORS[rng.integers(0, len(SEPARATORS))] if i else '') + item
+        if rng.random() < 0.2:
+            text = ';' + text + ', '
+        out.append(text)
+    return out
+
+def _bols(rng, n):
+    # A small pool so BOLs repeat, in assorted case/spacing
+    pool = [f'bol{i:03d}' for i in range(max(n // 3, 2))] + ['Straße-1', 'ﬁle-2']
+    styles = [str.upper, str.lower, lambda b: f' {b.upper()} ', lambda b: b.title()]
+    out = []
+    for bol in _pick(rng, pool, n):
+        roll = rng.random()
+        out.append(None if roll < 0.05 else np.nan if roll < 0.08 else
+                   styles[rng.integers(0, len(styles))](bol))
+    return out, pool
+
+def _restyle_header(rng, name):
+    roll = rng.random()
+    if roll < 0.1:
+        return name.upper()
+    if roll < 0.2:
+        return f' {name.lower()}  '.replace(' ', '  ', 1)
+    return name
+
+def random_case(seed: int, max_rows: int = 60):
+    """``(main_df, dq_df or None, keep_audit_col)`` for one seed."""
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(0, max_rows + 1))
+    codes = list(COUNTRY_MAP)[:30]
+    countries = codes + [COUNTRY_MAP[c] for c in codes[:5]] + ['XX', 'us', '', None, np.nan]
+
+    bols, pool = _bols(rng, n)
+    cols = {}
+    for name in MAIN_SOURCE_COLUMNS:
+        if rng.random() < 0.05:
+            continue  # missing column
+        if name == 'Bill of Lading':
+            values = bols
+        elif name == 'Ft Shipment Error':
+            values = _pick(rng, ERRORS, n)
+        elif name == 'Period Date':
+            # One format for most files; the reference infers from the first value
+            values = _pick(rng, DATES[:1] if rng.random() < 0.5 else DATES, n)
+        elif 'Country' in name:
+            values = _pick(rng, countries, n)
+        elif name.endswith(' Name') and name.startswith('Attr'):
+            values = _pick(rng, ATTR_NAMES, n)
+        elif name.endswith(' Value') and name.startswith('Attr'):
+            values = _lists(rng, n)
+        else:
+            values = _pick(rng, [f'{name} {i}' for i in range(4)] + ['', None], n)
+        cols[_restyle_header(rng, name)] = values
+    if rng.random() < 0.3:
+        cols['Unrelated'] = _pick(rng, ['x', None], n)
+    dtype = DTYPES[rng.integers(0, len(DTYPES))]
+    main_df = pd.DataFrame(cols, index=pd.RangeIndex(n), dtype=dtype)
+    if rng.random() < 0.2:
+        main_df.index = main_df.index[::-1] + 100  # non-default index
+
+    dq_df = None
+    if rng.random() < 0.85:
+        m = int(rng.integers(0, 2 * max_rows + 1))
+        dq_bols, _ = _bols(rng, m)
+        dq_bols = [b if rng.random() < 0.7 or not isinstance(b, str)
+                   else pool[rng.integers(0, len(pool))] for b in dq_bols]
+        dq_df = pd.DataFrame({
+            _restyle_header(rng, 'Carrier Name'): _pick(rng, ['C1', 'C2'], m),
+            _restyle_header(rng, 'Bill of Lading'): dq_bols,
+            _restyle_header(rng, 'Tracking Error'): _pick(rng, DQ_ERRORS, m),
+        }, dtype=dtype)
+    return main_df, dq_df, bool(rng.random() < 0.5)
+
+def _process_chunked(main_df, dq_df, keep_audit_col, chunk_rows=7):
+    chunks = (main_df.iloc[i:i + chunk_rows] for i in range(0, len(main_df), chunk_rows))
+    outs, stats = [], {'agg_date_nats': 0, 'ft_error_updates': 0}
+    for out, stats in process_files_chunked(chunks, dq_df, keep_audit_col=keep_audit_col):
+        outs.append(out)
+    if not outs:
+        return process_files(main_df, dq_df, keep_audit_col=keep_audit_col)
+    return pd.concat(outs), stats
+
+def engines(executor=None) -> dict:
+    """Engine name -> ``f(main_df, dq_df, keep_audit_col) -> (out, stats)``."""
+    return {
+        'process_files': lambda m, d, k: process_files(m, d, keep_audit_col=k),
+        'no_categoricals': lambda m, d, k: process_files(m, d, keep_audit_col=k,
+                                                         category_max_unique=None),
+        'chunked': _process_chunked,
+        'parallel': lambda m, d, k: process_files_parallel(m, d, keep_audit_col=k, workers=3,
+                                                           executor=executor,
+                                                           min_partition_rows=5),
+    }
+
+def compare(expected, actual) -> list:
+    """Differences between two ``(out, stats)`` results, as readable strings."""
+    (exp_df, exp_stats), (act_df, act_stats) = expected, actual
+    problems = []
+    act_stats = {k: v for k, v in act_stats.items() if k not in ('timings', 'rows')}
+    if act_stats != exp_stats:
+        problems.append(f"stats {act_stats} != {exp_stats}")
+    if list(act_df.columns) != list(exp_df.columns):
+        return problems + [f"columns {list(act_df.columns)} != {list(exp_df.columns)}"]
+    if not act_df.index.equals(exp_df.index):
+        return problems + ["index differs"]
+    for col in exp_df.columns:
+        exp, act = exp_df[col], act_df[col]
+        if not isinstance(act.dtype, pd.CategoricalDtype) and act.dtype != exp.dtype:
+            problems.append(f"{col!r}: dtype {act.dtype} != {exp.dtype}")
+            continue
+        for label, a, e in zip(exp.index, act.to_numpy(dtype=object), exp.to_numpy(dtype=object)):
+            same = pd.isna(a) and pd.isna(e) if pd.isna(a) or pd.isna(e) else a == e
+            if not same:
+                problems.append(f"{col!r} row {label!r}: {a!r} != {e!r}")
+                break
+    return problems
+
+def check(names, cases: int, seed: int = 0, max_rows: int = 60, executor=None) -> dict:
+    """Run ``cases`` random cases through each engine; returns ``{name: (seed, problems)}`` failures."""
+    available = engines(executor)
+    failures = {}
+    for case_seed in range(seed, seed + cases):
+        main_df, dq_df, keep_audit = random_case(case_seed, max_rows)
+        before = (main_df.copy(), dq_df.copy() if dq_df is not None else None)
+        expected = reference_process_files(main_df, dq_df, keep_audit_col=keep_audit)
+        for name in names:
+            if name in failures:
+                continue
+            problems = compare(expected, available[name](main_df, dq_df, keep_audit))
+            if not main_df.equals(before[0]) or (dq_df is not None and not dq_df.equals(before[1])):
+                problems.append("input frame modified")
+            if problems:
+                failures[name] = (case_seed, problems)
+    return failures
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--engine', nargs='+', default=['process_files', 'no_categoricals',
+                                                        'chunked', 'parallel'])
+    parser.add_argument('--cases', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-rows', type=int, default=60)
+    args = parser.parse_args(argv)
+    # Mixed Period Date formats are the point; pandas warns about every one
+    warnings.filterwarnings('ignore', category=UserWarning)
+
+    unknown = set(args.engine) - set(engines())
+    if unknown:
+        parser.error(f"unknown engine(s): {', '.join(sorted(unknown))}")
+    if 'parallel' in args.engine:
+        with ProcessPoolExecutor(3) as pool:
+            failures = check(args.engine, args.cases, args.seed, args.max_rows, executor=pool)
+    else:
+        failures = check(args.engine, args.cases, args.seed, args.max_rows)
+
+    for name in args.engine:
+        if name in failures:
+            case_seed, problems = failures[name]
+            print(f"FAIL {name}: case seed {case_seed}")
+            for problem in problems:
+                print(f"  {problem}")
+        else:
+            print(f"ok   {name}: {args.cases} cases")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
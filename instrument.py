@@ -0,0 +1,103 @@
+# instrument.py
+"""Lightweight per-step timing and memory records for the pipeline."""
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process so far in MiB (None where unsupported).
+
+    This is the process's high-water mark since it started, so under Streamlit
+    it covers every run the server has handled, not just the current one.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB on Linux
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+class StepRecorder:
+    """Records wall time, CPU time, rows in/out and memory growth per named step.
+
+    Each record is a plain dict, so ``records`` can travel in a stats dict and
+    across processes. ``peak_rss_delta_mib`` is how far the process-wide peak
+    RSS rose during the step (None where peak_rss_mb is unsupported);
+    ``alloc_peak_mib`` (peak Python allocations above the step's starting
+    point) is only filled while tracemalloc is tracing, which is left to the
+    caller because it slows everything down.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    @contextmanager
+    def step(self, name: str, rows_in: int | None = None):
+        """Time the ``with`` body; set ``record['rows_out']`` inside it if it differs from rows_in."""
+        record = {'step': name, 'rows_in': rows_in, 'rows_out': rows_in}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            alloc_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        rss_start = peak_rss_mb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - wall_start
+            record['cpu_s'] = time.process_time() - cpu_start
+            rss_end = peak_rss_mb()
+            record['peak_rss_delta_mib'] = rss_end - rss_start if rss_end is not None else None
+            record['alloc_peak_mib'] = (
+                (tracemalloc.get_traced_memory()[1] - alloc_start) / 2**20 if tracing else None
+            )
+            self.records.append(record)
+
+def timed_iter(iterable, recorder: StepRecorder, name: str):
+    """Yield from ``iterable``, recording each ``next()`` as step ``name`` (rows_out = len(item))."""
+    it = iter(iterable)
+    while True:
+        with recorder.step(name) as record:
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            record['rows_out'] = len(item)
+        yield item
+
+def merge_timings(*runs) -> list:
+    """Combine timing lists from several chunks or partitions, summing per step.
+
+    Times and rows add up; memory figures keep their maximum. Step order
+    follows first appearance.
+    """
+    merged = {}
+    for records in runs:
+        for r in records:
+            m = merged.get(r['step'])
+            if m is None:
+                merged[r['step']] = dict(r)
+                continue
+            for key in ('wall_s', 'cpu_s', 'rows_in', 'rows_out'):
+                if r[key] is not None:
+                    m[key] = (m[key] or 0) + r[key]
+            for key in ('peak_rss_delta_mib', 'alloc_peak_mib'):
+                if r[key] is not None:
+                    m[key] = max(m[key] or 0, r[key])
+    return list(merged.values())
+
+def timings_table(records) -> pd.DataFrame:
+    """Records as a display table, with each step's share of the total wall time."""
+    table = pd.DataFrame(records, columns=['step', 'wall_s', 'cpu_s', 'rows_in', 'rows_out',
+                                           'peak_rss_delta_mib', 'alloc_peak_mib'])
+    total = table['wall_s'].sum()
+    table['share'] = table['wall_s'] / total if total else 0.0
+    return table.set_index('step').round(3)
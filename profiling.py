@@ -0,0 +1,112 @@
+# profiling.py
+"""On-demand profiling of one run: cProfile plus an optional stack sampler."""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.005
+
+def _frame_label(code) -> str:
+    # ';' separates frames in collapsed stacks; the count follows the last space
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(';', ':')
+
+class StackSampler:
+    """Samples one thread's Python stack from a background thread.
+
+    Stacks are counted from ``root`` (the frame that started sampling) down,
+    so the result covers only the profiled block. ``collapsed()`` renders
+    them in the folded format flamegraph.pl / speedscope read.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, root=None) -> None:
+        self._thread_id = threading.get_ident()
+        self._root = root if root is not None else sys._getframe(1)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                if frame is self._root:
+                    break
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+class RunProfiler:
+    """Context manager profiling the current thread with cProfile (and sampling stacks).
+
+    ``stop()`` may be called early, inside the ``with`` block, so the outputs
+    can be built before the block ends.
+    """
+
+    def __init__(self, sample_stacks: bool = True, interval: float = SAMPLE_INTERVAL):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(interval) if sample_stacks else None
+        self._running = False
+
+    def start(self, root=None) -> None:
+        if self.sampler is not None:
+            self.sampler.start(root if root is not None else sys._getframe(1))
+        self.profile.enable()
+        self._running = True
+
+    def stop(self) -> None:
+        if self._running:
+            self.profile.disable()
+            if self.sampler is not None:
+                self.sampler.stop()
+            self._running = False
+
+    def __enter__(self):
+        self.start(sys._getframe(1))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def pstats_bytes(self) -> bytes:
+        """Same content as ``Profile.dump_stats``, loadable with pstats/snakeviz."""
+        stats = pstats.Stats(self.profile)
+        return marshal.dumps(stats.stats)
+
+    def summary(self, limit: int = 40) -> str:
+        buf = io.StringIO()
+        pstats.Stats(self.profile, stream=buf).sort_stats('cumulative').print_stats(limit)
+        return buf.getvalue()
+
+    def collapsed_stacks(self) -> str | None:
+        return self.sampler.collapsed() if self.sampler is not None else None
+
+    def outputs(self) -> dict:
+        """Download payloads: ``pstats`` bytes, ``summary`` text and ``collapsed`` stacks (or None)."""
+        self.stop()
+        return {'pstats': self.pstats_bytes(), 'summary': self.summary(),
+                'collapsed': self.collapsed_stacks()}
@@ -0,0 +1,251 @@
+# readers.py
+"""Workbook readers for the main and DQ uploads."""
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+from core import DQ_SOURCE_COLUMNS, MAIN_SOURCE_COLUMNS, HeaderIndex
+from instrument import StepRecorder
+from uploads import open_payload
+
+# Same strings pd.read_excel treats as missing with keep_default_na=True
+NA_STRINGS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null',
+})
+
+DEFAULT_CHUNKSIZE = 50_000
+
+# A handful of distinct values across the whole sheet; stored as categoricals
+# when reading with dtype_backend='arrow'
+ARROW_CATEGORICAL_COLUMNS = [
+    'Tenant Name', 'Shipment Mode', 'Carrier Name', 'Tracking Method', 'Shipment Tracking Method',
+]
+
+def to_arrow_dtypes(df: pd.DataFrame, categorical=ARROW_CATEGORICAL_COLUMNS) -> pd.DataFrame:
+    """Convert string columns to ``string[pyarrow]``; ``categorical`` ones to category."""
+    converted = {}
+    for col in df.columns:
+        s = df[col]
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype('string[pyarrow]')
+        if col in categorical:
+            s = s.astype('category')
+        converted[col] = s
+    return pd.DataFrame(converted, index=df.index)
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-column MiB of ``df`` as Python-object strings vs Arrow strings/categoricals."""
+    as_object = df.astype(object).memory_usage(index=False, deep=True)
+    as_arrow = to_arrow_dtypes(df).memory_usage(index=False, deep=True)
+    report = pd.DataFrame({'object MiB': as_object, 'arrow MiB': as_arrow}) / 2**20
+    report.loc['Total'] = report.sum()
+    report['ratio'] = report['object MiB'] / report['arrow MiB']
+    return report.round(2)
+
+def _mangle_headers(raw):
+    """Header names as pandas builds them: blanks become 'Unnamed: i', repeats get '.1', '.2', ..."""
+    names, counts = [], {}
+    for i, value in enumerate(raw):
+        name = f"Unnamed: {i}" if value is None or value == '' else str(value)
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name)
+    return names
+
+def _cell_to_str(cell):
+    """Cell value converted the way pd.read_excel(dtype=str) does; None for missing."""
+    value = cell.value
+    if value is None or cell.data_type == TYPE_ERROR:
+        return None
+    if cell.data_type == TYPE_NUMERIC:
+        as_int = int(value)
+        if as_int == value:
+            value = as_int
+    elif isinstance(value, str) and value in NA_STRINGS:
+        return None
+    return str(value)
+
+def _rewind(source) -> None:
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+def read_header(source) -> list:
+    """Pandas-style column names of the first sheet, reading only its first row."""
+    wb = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = wb.worksheets[0]
+        sheet.reset_dimensions()
+        first = next(sheet.iter_rows(max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+        _rewind(source)
+    return _mangle_headers(first)
+
+def main_source_columns(source) -> list:
+    """Actual header names of the MAIN_SOURCE_COLUMNS present in the main workbook."""
+    return list(HeaderIndex(read_header(source)).resolve_all(MAIN_SOURCE_COLUMNS).values())
+
+def dq_source_columns(source) -> list | None:
+    """Actual header names of the DQ columns, or None if either is missing."""
+    headers = HeaderIndex(read_header(source))
+    found = [headers.resolve(name, prefer_exact=False) for name in DQ_SOURCE_COLUMNS]
+    return None if None in found else found
+
+def iter_excel_chunks(source, columns=None, chunksize: int = DEFAULT_CHUNKSIZE):
+    """Stream the first sheet of ``source`` as string DataFrames of ``chunksize`` rows.
+
+    Only ``columns`` (by pandas-style header name) are kept when given; requested
+    columns missing from the sheet are skipped. Trailing blank rows are dropped,
+    matching pd.read_excel.
+    """
+    wb = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = wb.worksheets[0]
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows()
+        header = next(rows, None)
+        if header is None:
+            return
+        names = _mangle_headers([c.value for c in header])
+        wanted = set(names if columns is None else columns)
+        keep = [(pos, name) for pos, name in enumerate(names) if name in wanted]
+
+        buffer = {name: [] for _, name in keep}
+        buffered = 0
+        emitted = False
+        pending_blank = 0
+        for row in rows:
+            values = [_cell_to_str(c) for c in row]
+            if all(v is None for v in values):
+                # only kept once a later row has data
+                pending_blank += 1
+                continue
+            for _ in range(pending_blank):
+                for _, name in keep:
+                    buffer[name].append(None)
+            buffered += pending_blank
+            pending_blank = 0
+            width = len(values)
+            for pos, name in keep:
+                buffer[name].append(values[pos] if pos < width else None)
+            buffered += 1
+            if buffered >= chunksize:
+                yield pd.DataFrame(buffer, dtype=str)
+                buffer = {name: [] for _, name in keep}
+                buffered = 0
+                emitted = True
+        if buffered or not emitted:
+            yield pd.DataFrame(buffer, dtype=str)
+    finally:
+        wb.close()
+
+def read_excel_streaming(source, columns=None, chunksize: int = DEFAULT_CHUNKSIZE,
+                         dtype_backend: str = 'object') -> pd.DataFrame:
+    """Low-memory replacement for ``pd.read_excel(source, dtype=str)``.
+
+    With ``dtype_backend='arrow'`` each chunk is converted to ``string[pyarrow]``
+    as it arrives and ARROW_CATEGORICAL_COLUMNS become categoricals at the end.
+    """
+    chunks = iter_excel_chunks(source, columns=columns, chunksize=chunksize)
+    if dtype_backend == 'arrow':
+        chunks = (to_arrow_dtypes(chunk, categorical=()) for chunk in chunks)
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame(dtype=str)
+    df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+    if dtype_backend == 'arrow':
+        df = to_arrow_dtypes(df)
+    return df
+
+def read_excel_pandas(source, columns=None, dtype_backend: str = 'object') -> pd.DataFrame:
+    """``pd.read_excel(source, dtype=str)``, optionally converted to Arrow dtypes.
+
+    With ``columns``, the header row is read first and only the matching column
+    positions are parsed (``usecols``).
+    """
+    positions = None
+    if columns is not None:
+        header = read_header(source)
+        wanted = set(columns)
+        positions = [i for i, name in enumerate(header) if name in wanted]
+    if positions:
+        df = pd.read_excel(source, dtype=str, usecols=positions)
+        # pandas would de-duplicate names among the selected columns only
+        df.columns = [header[i] for i in positions]
+    else:
+        df = pd.read_excel(source, dtype=str)
+    return to_arrow_dtypes(df) if dtype_backend == 'arrow' else df
+
+def read_main_streaming(source, chunksize: int = DEFAULT_CHUNKSIZE,
+                        dtype_backend: str = 'object') -> pd.DataFrame:
+    """Stream the main workbook, keeping only the columns process_files uses."""
+    return read_excel_streaming(source, columns=main_source_columns(source), chunksize=chunksize,
+                                dtype_backend=dtype_backend)
+
+def read_main(source, streaming: bool = True, dtype_backend: str = 'object',
+              chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """Main workbook restricted to MAIN_SOURCE_COLUMNS."""
+    if streaming:
+        return read_main_streaming(source, chunksize=chunksize, dtype_backend=dtype_backend)
+    return read_excel_pandas(source, columns=main_source_columns(source), dtype_backend=dtype_backend)
+
+def read_dq(source, streaming: bool = True, dtype_backend: str = 'object') -> pd.DataFrame:
+    """DQ workbook restricted to its Bill of Lading and Tracking Error columns.
+
+    When either column cannot be found the whole sheet is read, so
+    build_dq_lookup can report every header it saw.
+    """
+    columns = dq_source_columns(source)
+    if streaming:
+        return read_excel_streaming(source, columns=columns, dtype_backend=dtype_backend)
+    return read_excel_pandas(source, columns=columns, dtype_backend=dtype_backend)
+
+# ===============================
+# Parsing several workbooks at once
+# ===============================
+
+WORKBOOK_READERS = {'main': read_main, 'dq': read_dq}
+
+def _parse_payload(kind: str, payload, streaming: bool, dtype_backend: str):
+    """Process-pool task: parse one UploadSource.payload(); returns (frame, timing record)."""
+    recorder = StepRecorder()
+    with recorder.step(f'read {kind}') as record, open_payload(payload) as source:
+        df = WORKBOOK_READERS[kind](source, streaming=streaming, dtype_backend=dtype_backend)
+        record['rows_out'] = len(df)
+    return df, record
+
+def parse_workbooks(jobs: dict, streaming: bool = True, dtype_backend: str = 'object',
+                    executor: ProcessPoolExecutor | None = None):
+    """Parse each ``label -> (kind, payload)`` job, concurrently when ``executor`` is given.
+
+    openpyxl's XML parsing holds the GIL, so only separate processes overlap.
+    Returns ``(frames, timings, errors)`` dicts keyed by label, where timings
+    are StepRecorder records; a failed job only has an entry in ``errors``.
+    """
+    frames, timings, errors = {}, {}, {}
+    if executor is None or len(jobs) < 2:
+        for label, (kind, payload) in jobs.items():
+            try:
+                frames[label], timings[label] = _parse_payload(kind, payload, streaming, dtype_backend)
+            except Exception as e:
+                errors[label] = e
+        return frames, timings, errors
+
+    futures = {
+        label: executor.submit(_parse_payload, kind, payload, streaming, dtype_backend)
+        for label, (kind, payload) in jobs.items()
+    }
+    for label, future in futures.items():
+        try:
+            frames[label], timings[label] = future.result()
+        except Exception as e:
+            errors[label] = e
+    return frames, timings, errors
@@ -0,0 +1,143 @@
+# reference.py
+"""Frozen reference engine: the straightforward, row-at-a-time process_files.
+
+This is the behaviour core.process_files must keep while its internals get
+faster. Nothing here is shared with core beyond the report constants
+(template, attribute mapping, country table), so an optimization in core can
+never change the reference along with it. Do not optimize this module; when
+the intended output changes, change it here and in core together.
+
+``equivalence.py`` compares any engine against ``reference_process_files``.
+"""
+import pandas as pd
+
+from core import (
+    COUNTRY_COLUMNS, COUNTRY_MAP, DQ_SOURCE_COLUMNS, EXPECTED_ATTR_MAPPING, MAIN_SOURCE_COLUMNS,
+    TEMPLATE_COLUMNS,
+)
+
+def dedupe_semicolon_list(value):
+    if pd.isna(value):
+        return value
+    if isinstance(value, str):
+        # normalize commas to semicolons, split, strip, unique-preserve-order
+        for sep in [',', ';']:
+            value = value.replace(sep, ';')
+        parts = [p.strip() for p in value.split(';') if p.strip()]
+        unique = list(dict.fromkeys(parts))
+        return ';'.join(unique)
+    return value
+
+def rearrange_attrs_row(row):
+    out = {
+        'Attr1 Name': '', 'Attr1 Value': '',
+        'Attr2 Name': '', 'Attr2 Value': '',
+        'Attr3 Name': '', 'Attr3 Value': '',
+        'Attr4 Name': '', 'Attr4 Value': '',
+        'Attr5 Name': '', 'Attr5 Value': ''
+    }
+    for i in range(1, 6):
+        name = row.get(f'Attr{i} Name')
+        value = row.get(f'Attr{i} Value')
+        if pd.notna(name) and name in EXPECTED_ATTR_MAPPING:
+            target = EXPECTED_ATTR_MAPPING[name]
+            out[f'{target} Name'] = name
+            out[f'{target} Value'] = value
+    return pd.Series(out)
+
+def monday_of_week(series_dt: pd.Series) -> pd.Series:
+    return (series_dt - pd.to_timedelta(series_dt.dt.weekday, unit='D')).dt.normalize()
+
+def _norm_bol(s):
+    if pd.isna(s):
+        return None
+    return str(s).strip().upper()
+
+def _norm_header(name) -> str:
+    return " ".join(str(name).lower().split())
+
+def _find_col(columns, name, prefer_exact=True):
+    """Exact header first (if ``prefer_exact``), else the first match ignoring case/spaces."""
+    if prefer_exact and name in columns:
+        return name
+    for c in columns:
+        if _norm_header(c) == _norm_header(name):
+            return c
+    return None
+
+def _as_source(values: pd.Series, source: pd.Series) -> pd.Series:
+    # Rewritten columns keep their input dtype (e.g. string[pyarrow] from the Arrow reader)
+    return values.astype(source.dtype)
+
+def reference_process_files(main_df: pd.DataFrame, dq_df: pd.DataFrame | None,
+                            keep_audit_col: bool = False, country_map: dict | None = None):
+    """Steps 1-7 on ``main_df``; returns ``(out, {'agg_date_nats', 'ft_error_updates'})``.
+
+    Columns keep their input values and dtypes (no categoricals). Neither
+    input frame is modified.
+    """
+    if country_map is None:
+        country_map = COUNTRY_MAP
+    main_df = main_df.rename(columns={
+        actual: name for name in MAIN_SOURCE_COLUMNS
+        if (actual := _find_col(list(main_df.columns), name)) is not None and actual != name
+    })
+
+    # 1) Start from template columns structure
+    out = pd.DataFrame(columns=TEMPLATE_COLUMNS, index=main_df.index)
+    for col in TEMPLATE_COLUMNS:
+        out[col] = main_df[col] if col in main_df.columns else None
+
+    # 2) Manual renames (copy from Shipment Tracking Type/Method if present)
+    if 'Shipment Tracking Type' in main_df.columns:
+        out['Tracking Type'] = main_df['Shipment Tracking Type']
+    if 'Shipment Tracking Method' in main_df.columns:
+        out['Tracking Method'] = main_df['Shipment Tracking Method']
+
+    # 3) Agg Date from Period Date (week starting Monday)
+    pdts = pd.to_datetime(out['Period Date'], errors='coerce')
+    out['Agg Date'] = monday_of_week(pdts)
+    agg_nats = int(pdts.isna().sum())
+
+    # 4) Country code mapping
+    for col in COUNTRY_COLUMNS:
+        out[col] = _as_source(out[col].map(lambda v: country_map.get(v, v)), out[col])
+
+    # 5) Attribute realignment
+    attr_cols = [f'Attr{i} {part}' for i in range(1, 6) for part in ('Name', 'Value')]
+    realigned = (out.apply(rearrange_attrs_row, axis=1) if len(out)
+                 else pd.DataFrame({col: pd.Series(dtype=object) for col in attr_cols}))
+    for col in attr_cols:
+        out[col] = _as_source(realigned[col], out[col])
+
+    # 6) De-duplicate AttrX Value lists
+    for i in range(1, 6):
+        c = f'Attr{i} Value'
+        out[c] = _as_source(out[c].apply(dedupe_semicolon_list), out[c])
+
+    # 7) VLOOKUP-style update from DQ (if provided)
+    updated_count = 0
+    if dq_df is not None:
+        bol_col, err_col = (_find_col(list(dq_df.columns), name, prefer_exact=False)
+                            for name in DQ_SOURCE_COLUMNS)
+        if bol_col is None or err_col is None:
+            raise KeyError(f"Required columns not found in DQ file. Have: {list(dq_df.columns)}")
+
+        dq = pd.DataFrame({'key': dq_df[bol_col].map(_norm_bol), 'error': dq_df[err_col]})
+        dq_lookup = (
+            dq.dropna(subset=['key'])
+              .drop_duplicates(subset=['key'])
+              .set_index('key')['error']
+        )
+
+        bol_keys = out['Bill of Lading'].map(_norm_bol)
+        mask_not_identified = out['Ft Shipment Error'].astype(str).str.strip().str.casefold().eq('not identified')
+        mapped_errors = bol_keys[mask_not_identified].map(dq_lookup)
+        idx_to_write = mapped_errors.index[mapped_errors.notna() & mapped_errors.astype(str).str.len().gt(0)]
+        out.loc[idx_to_write, 'Ft Shipment Error'] = mapped_errors.loc[idx_to_write]
+        updated_count = len(idx_to_write)
+
+        if keep_audit_col:
+            out['Tracking Error (from DQ)'] = bol_keys.map(dq_lookup).astype(dq_lookup.dtype)
+
+    return out, {'agg_date_nats': agg_nats, 'ft_error_updates': updated_count}
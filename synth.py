@@ -0,0 +1,148 @@
+# synth.py
+"""Synthetic 'Data Availability Trend' and 'Data Quality by Carrier' reports.
+
+Frames look like the real exports closely enough to exercise every step of
+process_files: shuffled Attr Name slots, semicolon/comma lists with
+duplicates, ISO codes and full country names, Period Dates across a few
+weeks, 'Not Identified' in assorted casing, and DQ files whose BOLs overlap
+the main file at a chosen ratio with different spacing and case.
+
+    python synth.py --rows 100000 --overlap 0.6 --out synthetic/
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core import COUNTRY_MAP, EXPECTED_ATTR_MAPPING, MAIN_SOURCE_COLUMNS
+from writers import ExcelChunkWriter
+
+CARRIERS = [f'Carrier {c}' for c in 'ABCDEFGHIJKLMNOPQRST']
+TENANTS = ['PepsiCo Beverages', 'PepsiCo Foods', 'Frito-Lay', 'Quaker']
+MODES = ['TL', 'LTL', 'PARCEL', 'RAIL', 'OCEAN']
+TRACKING_METHODS = ['ELD', 'MOBILE_APP', 'CARRIER_API', 'EDI', None]
+TRACKING_TYPES = ['TRACKED', 'UNTRACKED', 'PARTIAL']
+FT_ERRORS = ['Not Identified', 'not identified', ' NOT IDENTIFIED ', 'No Tracking Data',
+             'Late Assignment', 'Invalid Equipment', None]
+DQ_ERRORS = ['Carrier Not Onboarded', 'Invalid Equipment ID', 'Late Assignment',
+             'Missing Pings', 'Wrong Stop Sequence', '']
+ATTR_NAMES = list(EXPECTED_ATTR_MAPPING)
+
+LIST_SEPARATORS = [';', ',', '; ', ' , ']
+
+def _choice(rng, values, n, p=None):
+    return rng.choice(np.array(values, dtype=object), size=n, p=p)
+
+def _lists(rng, n: int, prefix: str, max_items: int = 4) -> np.ndarray:
+    """Semicolon/comma lists with repeated items and stray spaces, some blank."""
+    pool = np.array([f'{prefix}{i:06d}' for i in range(max(n // 3, 10))], dtype=object)
+    picks = pool[rng.integers(0, len(pool), (n, max_items + 1))]
+    counts = rng.integers(0, max_items + 1, n)
+    # The slot after a row's last item repeats its first one for 40% of multi-item rows
+    repeat = (counts > 1) & (rng.random(n) < 0.4)
+    picks[np.arange(n), counts] = picks[:, 0]
+    counts = counts + repeat
+    seps = rng.integers(0, len(LIST_SEPARATORS), n)
+
+    out = np.full(n, None, dtype=object)
+    out[counts == 1] = picks[counts == 1, 0]
+    for k in range(2, max_items + 2):
+        for j, sep in enumerate(LIST_SEPARATORS):
+            rows = np.flatnonzero((counts == k) & (seps == j))
+            if len(rows):
+                parts = [pd.Series(picks[rows, i]) for i in range(k)]
+                out[rows] = parts[0].str.cat(parts[1:], sep=sep).to_numpy(dtype=object)
+    return out
+
+def _country_values(rng, n: int) -> np.ndarray:
+    codes = list(COUNTRY_MAP)[:60] or ['US', 'MX', 'CA']
+    names = [COUNTRY_MAP[c] for c in codes[:20]] if COUNTRY_MAP else ['United States']
+    return _choice(rng, codes + names + ['XX', None], n)
+
+def make_main_frame(n: int, weeks: int = 1, start: str = '2024-05-06', seed: int = 0,
+                    bol_prefix: str = 'BOL') -> pd.DataFrame:
+    """Main report with every MAIN_SOURCE_COLUMNS header and ``n`` string rows."""
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, 7 * weeks, n), unit='D')
+    period = days.strftime('%Y-%m-%d').to_numpy(dtype=object)
+    period[rng.random(n) < 0.01] = None
+
+    cols = {c: _choice(rng, [f'{c} {i}' for i in range(50)], n) for c in MAIN_SOURCE_COLUMNS}
+    cols.update({
+        'Tenant Name': _choice(rng, TENANTS, n),
+        'Shipment Mode': _choice(rng, MODES, n),
+        'Carrier Name': _choice(rng, CARRIERS, n),
+        'Shipment Tracking Method': _choice(rng, TRACKING_METHODS, n),
+        'Shipment Tracking Type': _choice(rng, TRACKING_TYPES, n),
+        'Period Date': period,
+        'Ft Shipment Error': _choice(rng, FT_ERRORS, n, p=[.3, .1, .05, .25, .15, .1, .05]),
+        'P44 Shipment ID': np.array([f'{i:09d}' for i in rng.permutation(n)], dtype=object),
+        'Bill of Lading': np.array([f'{bol_prefix}{i:08d}' for i in range(n)], dtype=object),
+        'Tracked': _choice(rng, ['Yes', 'No'], n),
+    })
+    for col in ('Destination Country', 'Pickup Country', 'Destination Country.1',
+                'Pickup Country.1'):
+        cols[col] = _country_values(rng, n)
+
+    # Each row lists the expected attrs in a random slot order, with gaps and strays
+    order = np.argsort(rng.random((n, len(ATTR_NAMES))), axis=1)
+    names = np.array(ATTR_NAMES, dtype=object)[order]
+    names[rng.random(names.shape) < 0.1] = None
+    names[rng.random(names.shape) < 0.05] = 'Legacy Ref'
+    for slot in range(5):
+        cols[f'Attr{slot + 1} Name'] = names[:, slot]
+        cols[f'Attr{slot + 1} Value'] = _lists(rng, n, f'A{slot + 1}-')
+    return pd.DataFrame(cols, dtype=str)
+
+def make_dq_frame(main_df: pd.DataFrame, overlap: float = 0.6, extra: float = 0.2,
+                  duplicates: float = 0.02, seed: int = 1) -> pd.DataFrame:
+    """DQ report: ``overlap`` of the main BOLs (re-cased/re-spaced) plus unrelated ones.
+
+    ``extra`` is the share of unrelated BOLs relative to the main row count and
+    ``duplicates`` the share of BOLs listed twice with another error.
+    """
+    rng = np.random.default_rng(seed)
+    bols = main_df['Bill of Lading'].dropna().to_numpy(dtype=object)
+    picked = rng.choice(bols, size=int(len(bols) * overlap), replace=False)
+    styled = np.array([b.lower() if i % 3 == 0 else f' {b} ' if i % 3 == 1 else b
+                       for i, b in enumerate(picked)], dtype=object)
+    unrelated = np.array([f'ZZ{i:08d}' for i in range(int(len(bols) * extra))], dtype=object)
+    keys = np.concatenate([styled, unrelated])
+    dup = rng.choice(keys, size=int(len(keys) * duplicates), replace=False) if len(keys) else keys
+    keys = np.concatenate([keys, dup])
+    rng.shuffle(keys)
+    return pd.DataFrame({
+        'Carrier Name': _choice(rng, CARRIERS, len(keys)),
+        'Bill of Lading': keys,
+        'Tracking Error': _choice(rng, DQ_ERRORS, len(keys)),
+    }, dtype=str)
+
+def write_workbook(df: pd.DataFrame, target) -> None:
+    """Write ``df`` as a one-sheet XLSX with the streaming writer."""
+    with ExcelChunkWriter(target) as writer:
+        writer.write(df)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Write synthetic main and DQ workbooks.")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--weeks', type=int, default=1)
+    parser.add_argument('--start', default='2024-05-06', help="Monday of the first week.")
+    parser.add_argument('--overlap', type=float, default=0.6,
+                        help="Share of main BOLs present in the DQ file.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, default=Path('synthetic'))
+    args = parser.parse_args(argv)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    main_df = make_main_frame(args.rows, weeks=args.weeks, start=args.start, seed=args.seed)
+    dq_df = make_dq_frame(main_df, overlap=args.overlap, seed=args.seed + 1)
+    # The date in the names lets batch mode pair the two files
+    tag = f"{args.rows}_{pd.Timestamp(args.start):%Y-%m-%d}"
+    write_workbook(main_df, args.out / f"main_{tag}.xlsx")
+    write_workbook(dq_df, args.out / f"dq_{tag}.xlsx")
+    print(f"wrote {args.out}/main_{tag}.xlsx ({len(main_df):,} rows) and "
+          f"{args.out}/dq_{tag}.xlsx ({len(dq_df):,} rows)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import functools
+import io
+
+import openpyxl
+import pandas as pd
+
+import batch
+from batch import pair_by_week, week_from_name, write_combined
+from writers import ExcelChunkWriter
+
+def _result(df, week='2024-05-13'):
+    return {'week': pd.Timestamp(week), 'main': f'main_{week}.xlsx', 'dq': None, 'notes': [],
+            'error': None, 'result_df': df, 'stats': {}, 'seconds': 0.0}
+
+def _week_frames():
+    with_dq = pd.DataFrame({'Bill of Lading': ['A', 'B'], 'Ft Shipment Error': ['x', 'y'],
+                            'Tracking Error (from DQ)': ['x', None]})
+    without_dq = pd.DataFrame({'Bill of Lading': ['C'], 'Ft Shipment Error': ['z']})
+    return [_result(without_dq, '2024-05-06'), _result(with_dq), _result(None, '2024-05-20')]
+
+def test_write_combined_xlsx_takes_union_of_columns():
+    buf = io.BytesIO()
+    assert write_combined(_week_frames(), buf) == 3
+    rows = [[c.value for c in r] for r in openpyxl.load_workbook(buf).active.iter_rows()]
+    assert rows == [['Bill of Lading', 'Ft Shipment Error', 'Tracking Error (from DQ)'],
+                    ['C', 'z', None], ['A', 'x', 'x'], ['B', 'y', None]]
+
+def test_write_combined_parquet_takes_union_of_columns():
+    buf = io.BytesIO()
+    write_combined(_week_frames(), buf, 'parquet')
+    df = pd.read_parquet(io.BytesIO(buf.getvalue()))
+    assert list(df.columns) == ['Bill of Lading', 'Ft Shipment Error', 'Tracking Error (from DQ)']
+    assert df['Bill of Lading'].tolist() == ['C', 'A', 'B']
+
+def test_write_combined_xlsx_continues_on_new_sheets(monkeypatch):
+    monkeypatch.setattr(batch, 'ExcelChunkWriter', functools.partial(ExcelChunkWriter, max_rows=3))
+    buf = io.BytesIO()
+    write_combined(_week_frames(), buf)
+    wb = openpyxl.load_workbook(buf)
+    assert wb.sheetnames == ['Sheet1', 'Sheet2']
+    assert [c.value for c in next(wb['Sheet2'].iter_rows())][0] == 'Bill of Lading'
+
+def test_per_week_outputs_names_are_unique():
+    df = pd.DataFrame({'a': [1]})
+    results = [_result(df), _result(df), _result(df, '2024-05-20'), _result(df)]
+    names = [name for name, _ in batch.per_week_outputs(results, 'csv.gz')]
+    assert names == ['Pepsico0_2024-05-13.csv.gz', 'Pepsico0_2024-05-13_2.csv.gz',
+                     'Pepsico0_2024-05-20.csv.gz', 'Pepsico0_2024-05-13_3.csv.gz']
+
+def test_run_batch_shows_names_but_reads_payloads_by_key(monkeypatch):
+    calls = []
+    def fake_run_week(week, main_name, main_payload, dq_name, dq_payload, **options):
+        calls.append((main_name, main_payload, dq_name, dq_payload))
+        return {**_result(pd.DataFrame({'a': [1]})), 'main': main_name, 'dq': dq_name}
+    monkeypatch.setattr(batch, 'run_week', fake_run_week)
+    monkeypatch.setattr(batch, '_payload_nbytes', lambda payload: 0)
+    names = {'id1': 'report.xlsx', 'id2': 'report.xlsx', 'id3': 'report.xlsx'}
+    batch.run_batch([(None, 'id1', 'id3'), (None, 'id2', None)],
+                    {'id1': 'p1', 'id2': 'p2', 'id3': 'p3'}, names=names)
+    assert calls == [('report.xlsx', 'p1', 'report.xlsx', 'p3'), ('report.xlsx', 'p2', None, None)]
+
+def test_week_from_name_reads_dates_and_iso_weeks():
+    monday = pd.Timestamp('2024-05-13')
+    for name in ['main 2024-05-13.xlsx', 'main_2024_05_15.xlsx', 'dq.20240519.xlsx',
+                 'report 2024-W20.xlsx', 'report_2024w20.xlsx']:
+        assert week_from_name(name) == monday, name
+
+def test_week_from_name_without_a_valid_date():
+    for name in ['Data Quality by Carrier (3).xlsx', 'main 2024-13-40.xlsx', 'x 123456789.xlsx',
+                 'report 2024-W60.xlsx']:
+        assert week_from_name(name) is None, name
+
+def test_pair_by_week_single_pair_ignores_weeks():
+    pairs, unmatched = pair_by_week({'m': pd.Timestamp('2024-05-13')}, {'d': None})
+    assert pairs == [(pd.Timestamp('2024-05-13'), 'm', 'd')]
+    assert unmatched == []
+
+def test_pair_by_week_matches_dated_files():
+    w1, w2, w3 = (pd.Timestamp(d) for d in ['2024-05-06', '2024-05-13', '2024-05-20'])
+    mains = {'m2': w2, 'm1': w1, 'm1b': w1, 'mx': None}
+    dqs = {'d1': w1, 'd2': w2, 'd2b': w2, 'd3': w3}
+    pairs, unmatched = pair_by_week(mains, dqs)
+    assert pairs == [(w1, 'm1', 'd1'), (w1, 'm1b', 'd1'), (w2, 'm2', 'd2'), (None, 'mx', None)]
+    assert unmatched == [('d2b', 'another DQ file covers the same week'),
+                         ('d3', 'no main file for its week')]
+
+def test_pair_by_week_reports_undated_dq_without_overlap():
+    mains = {'m1': pd.Timestamp('2024-05-06'), 'm2': pd.Timestamp('2024-05-13')}
+    pairs, unmatched = pair_by_week(mains, {'Data Quality (1)': None, 'Data Quality (2)': None})
+    assert [dq for _, _, dq in pairs] == [None, None]
+    assert unmatched == [('Data Quality (1)', 'no week in its file name'),
+                         ('Data Quality (2)', 'no week in its file name')]
+
+def test_pair_by_week_matches_undated_dq_by_overlap():
+    w1, w2 = pd.Timestamp('2024-05-06'), pd.Timestamp('2024-05-13')
+    bols = {'m1': {'A', 'B'}, 'm2': {'C', 'D'}, 'm3': {'E'},
+            'dq_a': {'C'}, 'dq_b': {'A', 'B', 'C'}, 'dq_c': {'Z'}}
+    overlap = lambda main, dq: len(bols[main] & bols[dq])
+    pairs, unmatched = pair_by_week({'m1': w1, 'm2': w2, 'm3': w2}, {'dq_a': None, 'dq_b': None,
+                                                                      'dq_c': None}, overlap)
+    # dq_a takes m2 first, so dq_b goes to the best main still without a DQ file
+    assert pairs == [(w1, 'm1', 'dq_b'), (w2, 'm2', 'dq_a'), (w2, 'm3', None)]
+    assert unmatched == [('dq_c', 'no week in its file name and no main file '
+                                  'without a DQ file shares its BOLs')]
+
+def test_bol_overlap_reads_bill_of_lading_columns(tmp_path):
+    files = {'main.xlsx': pd.DataFrame({'Bill of Lading': [' a1', 'B2', None], 'x': [1, 2, 3]}),
+             'dq.xlsx': pd.DataFrame({'bill of  lading': ['A1', 'b2 ', 'C3']}),
+             'other.xlsx': pd.DataFrame({'Tracking Error': ['e']})}
+    for name, df in files.items():
+        with ExcelChunkWriter(tmp_path / name) as writer:
+            writer.write(df)
+    overlap = batch.bol_overlap(lambda name: tmp_path / name)
+    assert overlap('main.xlsx', 'dq.xlsx') == 2
+    assert overlap('main.xlsx', 'other.xlsx') == 0
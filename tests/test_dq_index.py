@@ -0,0 +1,29 @@
+import pandas as pd
+
+from dq_index import DQIndex
+
+def _errors(**errors):
+    return pd.Series(errors, dtype=object)
+
+def test_older_week_does_not_replace_newer_error(tmp_path):
+    index = DQIndex(tmp_path / 'dq.sqlite3')
+    index.update(_errors(A='Missing Pings', B='Late'), source='week 20', week='2024-05-20')
+    index.update(_errors(A='Carrier Not Onboarded', C='Old'), source='week 13', week='2024-05-13')
+    index.update(_errors(B='Unknown week'), source='no week')
+    found = index.lookup(['A', 'B', 'C'])
+    assert found.to_dict() == {'A': 'Missing Pings', 'B': 'Late', 'C': 'Old'}
+
+def test_same_or_later_week_replaces(tmp_path):
+    index = DQIndex(tmp_path / 'dq.sqlite3')
+    index.update(_errors(A='first', B='first'), source='one')
+    index.update(_errors(A='second'), source='two', week='2024-05-13')
+    index.update(_errors(A='third', B='third'), source='three', week='2024-05-13')
+    assert index.lookup(['A', 'B']).to_dict() == {'A': 'third', 'B': 'third'}
+
+def test_version_changes_only_when_an_upload_is_merged(tmp_path):
+    index = DQIndex(tmp_path / 'dq.sqlite3')
+    empty = index.version()
+    index.update(_errors(A='Late'), source='one')
+    merged = index.version()
+    index.update(_errors(A='Late'), source='one')
+    assert empty != merged == index.version()
@@ -0,0 +1,20 @@
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from equivalence import check
+
+@pytest.fixture(autouse=True)
+def _quiet_date_warnings():
+    # Mixed Period Date formats are the point; pandas warns about every one
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        yield
+
+def test_single_process_engines_match_reference():
+    assert check(['process_files', 'no_categoricals', 'chunked'], cases=100) == {}
+
+def test_parallel_engine_matches_reference():
+    with ProcessPoolExecutor(2) as pool:
+        assert check(['parallel'], cases=10, executor=pool) == {}
@@ -0,0 +1,37 @@
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from writers import ExcelChunkWriter, to_excel_bytes
+
+def _sheets(data) -> dict:
+    wb = openpyxl.load_workbook(io.BytesIO(data))
+    return {ws.title: [[c.value for c in row] for row in ws.iter_rows()] for ws in wb}
+
+def test_chunk_writer_continues_on_new_sheet_past_max_rows():
+    df = pd.DataFrame({'a': range(7), 'b': list('abcdefg')})
+    buf = io.BytesIO()
+    with ExcelChunkWriter(buf, max_rows=4) as writer:
+        writer.write(df.iloc[:2])
+        writer.write(df.iloc[2:])
+    assert writer.sheets == 3
+    sheets = _sheets(buf.getvalue())
+    assert list(sheets) == ['Sheet1', 'Sheet2', 'Sheet3']
+    assert all(rows[0] == ['a', 'b'] for rows in sheets.values())
+    assert [len(rows) for rows in sheets.values()] == [4, 4, 2]
+    assert [r[0] for rows in sheets.values() for r in rows[1:]] == list(range(7))
+
+def test_chunk_writer_rejects_changed_columns():
+    writer = ExcelChunkWriter(io.BytesIO())
+    writer.write(pd.DataFrame({'a': [1]}))
+    with pytest.raises(ValueError):
+        writer.write(pd.DataFrame({'b': [1]}))
+    writer.close()
+
+@pytest.mark.parametrize('engine', ['openpyxl-write-only', 'xlsxwriter'])
+def test_to_excel_bytes_keeps_header_of_empty_frame(engine):
+    pytest.importorskip(engine.split('-')[0])
+    data = to_excel_bytes(pd.DataFrame(columns=['a', 'b']), engine=engine)
+    assert _sheets(data) == {'Sheet1': [['a', 'b']]}
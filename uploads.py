@@ -0,0 +1,170 @@
+# uploads.py
+"""Zero-copy access to uploaded workbook bytes for the readers."""
+import io
+import mmap
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# Uploads larger than this are written to a temp file and memory-mapped
+SPILL_BYTES = int(os.environ.get("PEP_SPILL_BYTES", 256 * 1024**2))
+
+def upload_view(upload) -> memoryview:
+    """Read-only view of an uploaded file's bytes.
+
+    ``getvalue()`` on an unmodified BytesIO (Streamlit's UploadedFile) returns
+    the bytes object it was built from, whereas ``getbuffer()`` un-shares it
+    and copies the whole upload.
+    """
+    if isinstance(upload, (bytes, bytearray, memoryview, mmap.mmap)):
+        return memoryview(upload).toreadonly()
+    return memoryview(upload.getvalue())
+
+class BufferReader(io.RawIOBase):
+    """Seekable binary stream over a buffer that copies only the ranges read.
+
+    ``bytes_read`` counts the bytes handed out, i.e. what the parser copied.
+    """
+
+    def __init__(self, buffer, name: str | None = None):
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+        self.bytes_read = 0
+        if name is not None:
+            self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        chunk = self._view[self._pos:self._pos + len(b)]
+        n = len(chunk)
+        memoryview(b).cast('B')[:n] = chunk
+        self._pos += n
+        self.bytes_read += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if pos < 0:
+            # OSError like a real file, which zipfile expects for short inputs
+            raise OSError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+class UploadSource:
+    """Context manager giving parsers seekable access to one upload's bytes.
+
+    Small uploads are read straight from the upload's own buffer; uploads of
+    ``spill_bytes`` or more, or any upload on ``spill()``, are written once to
+    a temp file and memory-mapped, so the parse works from the page cache and
+    other processes can open ``path``. ``open()`` returns a fresh reader for
+    each parse pass.
+    """
+
+    def __init__(self, upload, spill_bytes: int = SPILL_BYTES):
+        self.name = getattr(upload, 'name', None)
+        self._view = upload_view(upload)
+        self.nbytes = self._view.nbytes
+        # Streamlit keeps its copy of the upload regardless of spilling
+        self.upload_nbytes = self.nbytes
+        self.path = None
+        self._file = None
+        self._mmap = None
+        self._readers = []
+        if self.nbytes >= spill_bytes:
+            self.spill()
+
+    def spill(self) -> str | None:
+        """Move the bytes to a memory-mapped temp file (once); returns its path.
+
+        Used before handing ``payload()`` to a worker process, which would
+        otherwise receive a pickled copy of the whole upload. Empty uploads
+        are never spilled.
+        """
+        if self.path is None and self.nbytes:
+            self._file = tempfile.NamedTemporaryFile(suffix=Path(self.name or '').suffix or '.xlsx')
+            self._file.write(self._view)
+            self._file.flush()
+            self._view.release()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+            self.path = self._file.name
+        return self.path
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    @property
+    def bytes_read(self) -> int:
+        return sum(r.bytes_read for r in self._readers)
+
+    def payload(self):
+        """Picklable handle for another process: the temp file path if spilled, else the bytes."""
+        return self.path if self.spilled else self._view.obj
+
+    def open(self) -> io.BufferedReader:
+        raw = BufferReader(self._view, name=self.name)
+        self._readers.append(raw)
+        return io.BufferedReader(raw)
+
+    def close(self) -> None:
+        # Exported views must be released before the mmap can close
+        for reader in self._readers:
+            reader.close()
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def open_payload(payload):
+    """Binary stream over an UploadSource.payload() received from another process."""
+    if isinstance(payload, (str, os.PathLike)):
+        return open(payload, 'rb')
+    return io.BufferedReader(BufferReader(payload))
+
+def buffer_report(sources: dict, frames: dict | None = None) -> pd.DataFrame:
+    """MiB held or copied at each stage of the upload -> parse path, per file.
+
+    ``sources`` maps a label to an UploadSource after parsing; ``frames`` maps
+    the same labels to the parsed DataFrames. Parses run in a worker process
+    read the spilled temp file themselves, so they are not counted as read.
+    """
+    rows = {}
+    for label, src in sources.items():
+        frame = (frames or {}).get(label)
+        frame_bytes = 0 if frame is None else int(frame.memory_usage(index=True, deep=True).sum())
+        rows[label] = {
+            'upload buffer': src.upload_nbytes,
+            'memory-mapped temp file': src.nbytes if src.spilled else 0,
+            'read by parser': src.bytes_read,
+            'parsed frame': frame_bytes,
+        }
+    return (pd.DataFrame(rows).T / 2**20).round(2)
@@ -0,0 +1,206 @@
+# writers.py
+"""Output writers for processed report frames."""
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+DATETIME_FORMAT = "yyyy-mm-dd"
+
+# Mirrors the header style pandas' ExcelWriter applies
+_THIN = Side(style="thin")
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+
+def _excel_rows(df: pd.DataFrame):
+    """Row lists with NaN/NaT as None and datetimes as python datetimes."""
+    columns = []
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            values = s.dt.to_pydatetime()
+        else:
+            values = s.to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = None
+        columns.append(values)
+    return zip(*columns)
+
+# Rows per worksheet, header included
+EXCEL_MAX_ROWS = 1_048_576
+
+class ExcelChunkWriter:
+    """Append DataFrame chunks to an XLSX with constant memory.
+
+    Uses an openpyxl write-only workbook, which spools rows to a temp file
+    as they are appended; ``target`` (path or binary file object) is written
+    on close(). Rows past one sheet's ``max_rows`` (header included) continue
+    on Sheet2, Sheet3, ..., each with its own header; ``sheets`` counts them.
+    """
+
+    def __init__(self, target, datetime_format: str = DATETIME_FORMAT,
+                 max_rows: int = EXCEL_MAX_ROWS):
+        self.target = target
+        self.datetime_format = datetime_format
+        self.max_rows = max_rows
+        self.sheets = 0
+        self._wb = Workbook(write_only=True)
+        self._ws = None
+        self._sheet_rows = 0
+        self._columns = None
+        self._date_positions = ()
+
+    def _new_sheet(self) -> None:
+        self.sheets += 1
+        self._ws = self._wb.create_sheet(f"Sheet{self.sheets}")
+        self._sheet_rows = 0
+        if self._columns:
+            header = []
+            for name in self._columns:
+                cell = WriteOnlyCell(self._ws, value=str(name))
+                cell.font = _HEADER_FONT
+                cell.border = _HEADER_BORDER
+                cell.alignment = _HEADER_ALIGNMENT
+                header.append(cell)
+            self._ws.append(header)
+            self._sheet_rows = 1
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._columns is None:
+            self._columns = list(df.columns)
+            self._date_positions = [
+                i for i, col in enumerate(self._columns)
+                if pd.api.types.is_datetime64_any_dtype(df[col])
+            ]
+            self._new_sheet()
+        elif list(df.columns) != self._columns:
+            raise ValueError("All chunks must have the same columns.")
+
+        for row in _excel_rows(df):
+            if self._sheet_rows >= self.max_rows:
+                self._new_sheet()
+            if self._date_positions:
+                row = list(row)
+                for i in self._date_positions:
+                    if row[i] is not None:
+                        cell = WriteOnlyCell(self._ws, value=row[i])
+                        cell.number_format = self.datetime_format
+                        row[i] = cell
+            self._ws.append(row)
+            self._sheet_rows += 1
+
+    def close(self) -> None:
+        if self._ws is None:
+            self._new_sheet()
+        self._wb.save(self.target)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+def _write_openpyxl(df: pd.DataFrame, buf) -> None:
+    # Full in-memory workbook via pandas; kept for comparison
+    with pd.ExcelWriter(buf, engine="openpyxl", datetime_format=DATETIME_FORMAT) as writer:
+        df.to_excel(writer, index=False)
+
+def _write_openpyxl_streaming(df: pd.DataFrame, buf) -> None:
+    with ExcelChunkWriter(buf) as writer:
+        writer.write(df)
+
+def _write_xlsxwriter(df: pd.DataFrame, buf) -> None:
+    try:
+        import xlsxwriter
+    except ImportError as e:
+        raise ImportError("The 'xlsxwriter' engine requires the xlsxwriter package.") from e
+
+    # constant_memory flushes each row as soon as the next one starts, so rows
+    # must be written strictly in order (pandas' to_excel writes column-wise).
+    wb = xlsxwriter.Workbook(buf, {'constant_memory': True,
+                                   'default_date_format': DATETIME_FORMAT})
+    header = [str(c) for c in df.columns]
+    header_fmt = wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    ws, r = None, EXCEL_MAX_ROWS
+    for row in _excel_rows(df):
+        if r >= EXCEL_MAX_ROWS:
+            # Sheet1, Sheet2, ... as in ExcelChunkWriter
+            ws = wb.add_worksheet()
+            ws.write_row(0, 0, header, header_fmt)
+            r = 1
+        ws.write_row(r, 0, row)
+        r += 1
+    if ws is None:
+        wb.add_worksheet().write_row(0, 0, header, header_fmt)
+    wb.close()
+
+EXCEL_ENGINES = {
+    'openpyxl-write-only': _write_openpyxl_streaming,
+    'xlsxwriter': _write_xlsxwriter,
+    'openpyxl': _write_openpyxl,
+}
+DEFAULT_EXCEL_ENGINE = 'openpyxl-write-only'
+
+def to_excel_bytes(df: pd.DataFrame, filename: str = "Pepsico0.xlsx",
+                   engine: str = DEFAULT_EXCEL_ENGINE) -> bytes:
+    """Serialize ``df`` to XLSX with one of EXCEL_ENGINES (dates as yyyy-mm-dd)."""
+    if engine not in EXCEL_ENGINES:
+        raise ValueError(f"Unknown Excel engine {engine!r}; choose from {list(EXCEL_ENGINES)}")
+    buf = io.BytesIO()
+    EXCEL_ENGINES[engine](df, buf)
+    buf.seek(0)
+    return buf.read()
+
+# ===============================
+# Columnar / text exports
+# ===============================
+
+# High-cardinality identifiers barely compress, so spend less CPU on them;
+# everything else gets zstd.
+PARQUET_DEFAULT_COMPRESSION = 'zstd'
+PARQUET_COLUMN_COMPRESSION = {
+    'P44 Shipment ID': 'snappy',
+    'Bill of Lading': 'snappy',
+    'Active Equipment ID': 'snappy',
+    'Historical Equipment ID': 'snappy',
+}
+
+def _arrow_table(df: pd.DataFrame):
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Parquet and Arrow exports require the pyarrow package.") from e
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def to_parquet_bytes(df: pd.DataFrame, compression: dict | str | None = None) -> bytes:
+    """Parquet export; ``compression`` is one codec or a per-column mapping."""
+    import pyarrow.parquet as pq
+
+    table = _arrow_table(df)
+    if compression is None:
+        compression = {
+            name: PARQUET_COLUMN_COMPRESSION.get(name, PARQUET_DEFAULT_COMPRESSION)
+            for name in table.column_names
+        }
+    buf = io.BytesIO()
+    pq.write_table(table, buf, compression=compression)
+    return buf.getvalue()
+
+def to_csv_gz_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False, date_format="%Y-%m-%d", compression={'method': 'gzip', 'mtime': 0})
+    return buf.getvalue()
+
+def to_arrow_ipc_bytes(df: pd.DataFrame, compression: str | None = 'zstd') -> bytes:
+    """Arrow IPC file (Feather v2) export."""
+    import pyarrow as pa
+
+    table = _arrow_table(df)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()